@@ -16,13 +16,26 @@
     # 接收 JSON  
     response = recv_json(sock)
 
+二進位資料 (例如遊戲套件) 可在 JSON 請求之後以獨立的 frame 傳送原始位元組，
+省去 base64 編碼:
+    send_json(sock, {"type": "UPLOAD_VERSION", ..., "packageSize": len(raw)})
+    send_frame(sock, raw)
+
 支援的最大封包: 4MB (用於遊戲檔案傳輸)
 """
+import asyncio
 import json
 import socket
 import struct
+import sys
 import contextlib
-from typing import Any, Dict
+from typing import Any, Dict, Iterator
+
+# orjson 為選用套件: 有安裝時用於加速編解碼，否則使用標準函式庫 json
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 依執行環境而定
+    orjson = None
 
 # ============================================================
 # 常數定義
@@ -30,6 +43,20 @@ from typing import Any, Dict
 # 最大封包大小 (4MB，用於傳輸遊戲檔案)
 MAX_FRAME = 4 * 1024 * 1024
 
+# 分段接收時每次讀取的大小 (64KB)
+CHUNK_SIZE = 64 * 1024
+
+# 共用的 JSON 編碼器 (json.dumps 帶參數時每次都會建立新的 encoder)
+_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+# 預先編譯的 4 bytes 長度標頭 (Big-Endian)
+_LENGTH = struct.Struct("!I")
+_pack_length = _LENGTH.pack
+_unpack_length = _LENGTH.unpack
+
+# Linux 上以 MSG_WAITALL 讓 kernel 收滿指定長度才返回，多數情況一次 recv 即可
+_RECV_FLAGS = getattr(socket, "MSG_WAITALL", 0) if sys.platform.startswith("linux") else 0
+
 
 # ============================================================
 # 工具函數
@@ -81,9 +108,14 @@ def recv_all(sock: socket.socket, length: int) -> bytes:
     Raises:
         ConnectionError: 連線中斷
     """
-    data = bytearray()
+    first = sock.recv(length, _RECV_FLAGS)
+    if len(first) == length:
+        return first
+    if not first:
+        raise ConnectionError("連線已關閉")
+    data = bytearray(first)
     while len(data) < length:
-        chunk = sock.recv(length - len(data))
+        chunk = sock.recv(length - len(data), _RECV_FLAGS)
         if not chunk:
             raise ConnectionError("連線已關閉")
         data.extend(chunk)
@@ -104,9 +136,10 @@ def send_all(sock: socket.socket, data: bytes) -> None:
     Raises:
         ConnectionError: 連線中斷
     """
+    view = memoryview(data)
     total = 0
     while total < len(data):
-        sent = sock.send(data[total:])
+        sent = sock.send(view[total:])
         if sent <= 0:
             raise ConnectionError("連線已關閉")
         total += sent
@@ -130,9 +163,8 @@ def send_frame(sock: socket.socket, body: bytes) -> None:
     """
     if len(body) <= 0 or len(body) > MAX_FRAME:
         raise ValueError("封包大小無效")
-    header = struct.pack("!I", len(body))  # 4 bytes, big-endian (!I)
-    send_all(sock, header)
-    send_all(sock, body)
+    # 標頭與內容合併後一次送出，避免小封包被拆成兩次 send
+    send_all(sock, _pack_length(len(body)) + body)
 
 
 def recv_frame(sock: socket.socket) -> bytes:
@@ -150,22 +182,112 @@ def recv_frame(sock: socket.socket) -> bytes:
     Raises:
         ValueError: 封包大小無效
     """
-    header = recv_all(sock, 4)
-    (length,) = struct.unpack("!I", header)
+    (length,) = _unpack_length(recv_all(sock, 4))
     if length <= 0 or length > MAX_FRAME:
         raise ValueError("封包大小無效")
     return recv_all(sock, length)
 
 
+async def recv_frame_async(reader: asyncio.StreamReader) -> bytes:
+    """
+    接收 length-prefixed 封包 (asyncio 版本)
+
+    用途: 以 asyncio.start_server 實作的伺服器，在 event loop 中等待請求
+
+    Args:
+        reader: asyncio StreamReader
+
+    Returns:
+        bytes: 封包內容 (不含長度標頭)
+
+    Raises:
+        ValueError: 封包大小無效
+        asyncio.IncompleteReadError: 連線中斷
+    """
+    (length,) = _unpack_length(await reader.readexactly(4))
+    if length <= 0 or length > MAX_FRAME:
+        raise ValueError("封包大小無效")
+    return await reader.readexactly(length)
+
+
+def recv_frame_chunks(sock: socket.socket, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    分段接收 length-prefixed 封包
+
+    用途: 接收大型二進位資料 (例如遊戲套件) 時邊收邊寫入檔案，
+          不需把整個封包放在記憶體中
+
+    注意: 呼叫端必須讀完所有區塊，否則剩餘資料會殘留在連線中
+
+    Args:
+        sock: TCP socket
+        chunk_size: 每個區塊的最大位元組數
+
+    Yields:
+        bytes: 封包內容的區塊
+
+    Raises:
+        ValueError: 封包大小無效
+        ConnectionError: 連線中斷
+    """
+    (length,) = _unpack_length(recv_all(sock, 4))
+    if length <= 0 or length > MAX_FRAME:
+        raise ValueError("封包大小無效")
+    remaining = length
+    while remaining:
+        chunk = sock.recv(min(chunk_size, remaining))
+        if not chunk:
+            raise ConnectionError("連線已關閉")
+        remaining -= len(chunk)
+        yield chunk
+
+
 # ============================================================
 # JSON 高階 API (主要使用這兩個函數)
 # ============================================================
+def encode_json(obj: Dict[str, Any]) -> bytes:
+    """
+    將 dict 編碼為封包 body (緊湊 JSON + UTF-8)
+
+    固定不變的回應可在模組載入時先編碼一次，之後以 send_frame 直接送出
+
+    Args:
+        obj: 要編碼的 dict
+
+    Returns:
+        bytes: 封包內容 (不含長度標頭)
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except orjson.JSONEncodeError:
+            # 少數回應以 int 作為 key (例如 versions[game_id])，與 json 相同轉為字串；
+            # OPT_NON_STR_KEYS 會讓所有 dict 的編碼變慢，只在需要時使用
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return _JSON_ENCODER.encode(obj).encode("utf-8")
+
+
+def decode_json(body: bytes) -> Dict[str, Any]:
+    """
+    將封包 body 解碼為 dict (encode_json 的反向操作)
+
+    Args:
+        body: 封包內容 (UTF-8 JSON)
+
+    Returns:
+        dict: 解析後的 JSON 物件
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body.decode("utf-8"))
+
+
 def send_json(sock: socket.socket, obj: Dict[str, Any]) -> None:
     """
     傳送 JSON 物件
     
     這是最常用的發送函數，自動處理:
-    - JSON 序列化 (緊湊格式，無空格)
+    - JSON 序列化 (緊湊格式，無空格；有安裝 orjson 時使用 orjson)
     - UTF-8 編碼
     - Length-Prefixed 封裝
     
@@ -176,8 +298,7 @@ def send_json(sock: socket.socket, obj: Dict[str, Any]) -> None:
         sock: TCP socket
         obj: 要傳送的 dict
     """
-    body = json.dumps(obj, separators=(",", ":")).encode("utf-8")
-    send_frame(sock, body)
+    send_frame(sock, encode_json(obj))
 
 
 def recv_json(sock: socket.socket) -> Dict[str, Any]:
@@ -197,5 +318,4 @@ def recv_json(sock: socket.socket) -> Dict[str, Any]:
     Returns:
         dict: 解析後的 JSON 物件
     """
-    body = recv_frame(sock)
-    return json.loads(body.decode("utf-8"))
+    return decode_json(recv_frame(sock))
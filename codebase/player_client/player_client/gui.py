@@ -39,7 +39,7 @@ from pathlib import Path
 from tkinter import messagebox, ttk
 from typing import Any, Dict, List, Optional, Tuple
 
-from common.lp import recv_json, send_json
+from common.lp import recv_frame, recv_json, send_json
 
 
 # 遊戲下載存放目錄
@@ -85,7 +85,11 @@ class LobbyConnection:
             if not self.sock:
                 raise RuntimeError("connection not available")
             send_json(self.sock, payload)
-            return recv_json(self.sock)
+            resp = recv_json(self.sock)
+            if "packageSize" in resp:
+                # 遊戲套件以獨立的二進位 frame 緊接在回應之後
+                resp["package"] = recv_frame(self.sock)
+            return resp
 
 
 def hash_password(password: str) -> str:
@@ -99,7 +103,7 @@ def ensure_dir(path: Path) -> Path:
     return path
 
 
-def save_package(root: Path, game: Dict[str, Any], version: Dict[str, Any], payload: str, expected_sha256: Optional[str] = None) -> Path:
+def save_package(root: Path, game: Dict[str, Any], version: Dict[str, Any], data: bytes, expected_sha256: Optional[str] = None) -> Path:
     """
     Save and extract a game package.
     Validates SHA256 hash if provided to ensure file integrity.
@@ -109,9 +113,6 @@ def save_package(root: Path, game: Dict[str, Any], version: Dict[str, Any], payl
     version_folder = ensure_dir(root / game_slug / "versions" / version["version_label"])
     package_path = version_folder / "package.zip"
     
-    # Decode and validate data
-    data = base64.b64decode(payload.encode("ascii"))
-    
     # Verify SHA256 hash if provided
     if expected_sha256:
         actual_sha256 = hashlib.sha256(data).hexdigest()
@@ -28,35 +28,153 @@ import base64
 import hashlib
 import json
 import os
+import queue
+import secrets
 import socket
 import threading
 import time
-import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Tuple
 
-from common.lp import recv_json, send_json
+from common.lp import MAX_FRAME, decode_json, encode_json, recv_frame, recv_frame_chunks, recv_json, send_frame, send_json
+
+# ============================================================
+# 常數定義
+# ============================================================
+# DB Server 連線池保留的閒置連線數
+DB_POOL_SIZE = 8
+# 同時服務的開發者連線上限 (處理連線的 worker thread 數)；
+# 連線會長時間佔用 worker，已滿時新連線直接回覆 ERR_SERVER_BUSY 並關閉，不排隊等待
+MAX_CLIENTS = 64
+# 串流上傳的套件大小上限 (解壓後)，與舊版單一 frame 上傳的上限相同
+MAX_PACKAGE_SIZE = MAX_FRAME
+# 開發者帳號查詢結果的快取時間 (秒)
+ACCOUNT_CACHE_TTL = 5.0
+# DB Server 成功回應的開頭 b'{"ok":true,"result":'，用於直接轉送查詢結果
+RESULT_PREFIX = encode_json({"ok": True, "result": None})[:-len(b"null}")]
+
+# 預先編碼的固定回應
+OK_RESPONSE = encode_json({"ok": True})
+PONG_RESPONSE = encode_json({"ok": True, "pong": True})
+ERR_NOT_LOGGED_IN = encode_json({"ok": False, "error": "請先登入"})
+ERR_SERVER_BUSY = encode_json({"ok": False, "error": "伺服器連線數已滿，請稍後再試"})
+ERR_MISSING_CREDENTIALS = encode_json({"ok": False, "error": "請提供帳號和密碼"})
+ERR_USERNAME_TAKEN = encode_json({"ok": False, "error": "帳號已被使用"})
+ERR_INVALID_PACKAGE_SIZE = encode_json(
+    {"ok": False, "error": f"packageSize 必須是 1 到 {MAX_PACKAGE_SIZE} 之間的整數"}
+)
+ERR_BAD_CREDENTIALS = encode_json({"ok": False, "error": "帳號或密碼錯誤"})
+ERR_ALREADY_LOGGED_IN = encode_json({"ok": False, "error": "This account is already logged in from another session"})
+ERR_MISSING_GAME_ID = encode_json({"ok": False, "error": "請提供 gameId"})
+ERR_GAME_NOT_FOUND = encode_json({"ok": False, "error": "找不到遊戲"})
+ERR_REVIEWS_DENIED = encode_json({"ok": False, "error": "無權限查看"})
+ERR_EMPTY_PACKAGE = encode_json({"ok": False, "error": "上傳的檔案是空的"})
+
+
+# ============================================================
+# 檔案寫入工具
+# ============================================================
+def write_fully(fp: BinaryIO, data: bytes) -> None:
+    """寫入完整資料 (無緩衝檔案的 write() 可能只寫入部分資料)"""
+    view = memoryview(data)
+    while view:
+        view = view[fp.write(view):]
 
 
 # ============================================================
 # DB Server 客戶端封裝
 # ============================================================
 class DBClient:
-    """DB Server 客戶端，封裝資料庫操作"""
+    """
+    DB Server 客戶端，封裝資料庫操作
+
+    連線會保留在連線池中重複使用 (DB Server 支援同一連線多次請求)，
+    避免每次呼叫都重新建立 TCP 連線
+    """
     
-    def __init__(self, host: str, port: int) -> None:
+    def __init__(self, host: str, port: int, pool_size: int = DB_POOL_SIZE) -> None:
         self.host = host
         self.port = port
+        self.pool: "queue.LifoQueue[socket.socket]" = queue.LifoQueue(maxsize=pool_size)
+        # (entity, action) -> 已編碼的請求開頭 b'{"entity":...,"action":...,"data":'
+        self.envelopes: Dict[Tuple[str, str], bytes] = {}
+
+    def encode_request(self, entity: str, action: str, data: Dict) -> bytes:
+        """編碼請求封包，固定的 entity/action 部分只編碼一次"""
+        prefix = self.envelopes.get((entity, action))
+        if prefix is None:
+            prefix = encode_json({"entity": entity, "action": action})[:-1] + b',"data":'
+            self.envelopes[(entity, action)] = prefix
+        return prefix + encode_json(data) + b"}"
+
+    def connect(self) -> socket.socket:
+        """建立新的 DB Server 連線"""
+        s = socket.create_connection((self.host, self.port))
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # 閒置在連線池中的連線若已失效，可由 keepalive 偵測
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        return s
+
+    def release(self, s: socket.socket) -> None:
+        """將連線放回連線池，池已滿則關閉"""
+        try:
+            self.pool.put_nowait(s)
+        except queue.Full:
+            s.close()
+
+    def request(self, entity: str, action: str, data: Dict) -> bytes:
+        """向 DB Server 發送請求，回傳未解碼的回應封包內容"""
+        request = self.encode_request(entity, action, data)
+        try:
+            s = self.pool.get_nowait()
+            reused = True
+        except queue.Empty:
+            s = self.connect()
+            reused = False
+        try:
+            send_frame(s, request)
+            body = recv_frame(s)
+        except (ConnectionError, OSError):
+            s.close()
+            if not reused:
+                raise
+            # 池中的連線可能已被 DB Server 關閉 (例如重新啟動)，改用新連線重試一次
+            s = self.connect()
+            try:
+                send_frame(s, request)
+                body = recv_frame(s)
+            except Exception:
+                s.close()
+                raise
+        except Exception:
+            s.close()
+            raise
+        self.release(s)
+        return body
 
     def call(self, entity: str, action: str, data: Dict) -> Dict:
         """向 DB Server 發送請求"""
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.connect((self.host, self.port))
-            send_json(s, {"entity": entity, "action": action, "data": data})
-            resp = recv_json(s)
-            if not resp.get("ok"):
-                raise RuntimeError(resp.get("error", "資料庫錯誤"))
-            return resp["result"]
+        resp = decode_json(self.request(entity, action, data))
+        if not resp.get("ok"):
+            raise RuntimeError(resp.get("error", "資料庫錯誤"))
+        return resp["result"]
+
+    def call_raw(self, entity: str, action: str, data: Dict) -> bytes:
+        """
+        向 DB Server 發送請求，回傳 result 的 JSON 原始位元組
+
+        用於直接轉送給客戶端的查詢結果，省去解碼後再重新編碼
+        """
+        body = self.request(entity, action, data)
+        # DB Server 成功回應固定為 {"ok":true,"result":...}，直接切出 result 部分
+        if body.startswith(RESULT_PREFIX):
+            return body[len(RESULT_PREFIX):-1]
+        resp = decode_json(body)
+        if not resp.get("ok"):
+            raise RuntimeError(resp.get("error", "資料庫錯誤"))
+        return encode_json(resp["result"])
 
 
 # ============================================================
@@ -79,7 +197,7 @@ class DeveloperSession:
         self.account_id = account_id
         self.username = username
         self.display_name = display_name
-        self.token = uuid.uuid4().hex
+        self.token = secrets.token_hex(16)
         self.issued_at = int(time.time())
 
 
@@ -106,8 +224,37 @@ class DeveloperServer:
         self.port = port
         self.db = DBClient(db_host, db_port)
         self.storage_root = storage_root  # 遊戲檔案儲存路徑
+        self._storage_dir = str(storage_root)  # 上傳路徑以 os.path.join 組合，避免每次建立 Path 物件
+        self._known_folders: set[int] = set()  # 已建立資料夾的 game_id，上傳時不必每次 mkdir
         self.sessions: Dict[socket.socket, Optional[DeveloperSession]] = {}
+        self.logged_in: Dict[int, socket.socket] = {}  # account_id -> 登入中的連線
+        # sessions 每個 key 只由該連線的 thread 寫入，dict 單一操作在 GIL 下即為原子操作；
+        # 只有 logged_in 的「檢查後佔用」需要上鎖
         self.lock = threading.Lock()
+        # username -> (查詢時間, 帳號資料)，減少重複登入/註冊檢查的 DB 查詢
+        self._acct_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._acct_lock = threading.Lock()
+        # 每個連線由 worker thread 處理到斷線為止；_slots 記錄剩餘的 worker 數，
+        # 已滿時拒絕新連線 (排隊的連線可能永遠等不到 worker)
+        self.pool = ThreadPoolExecutor(max_workers=MAX_CLIENTS, thread_name_prefix="dev")
+        self._slots = threading.BoundedSemaphore(MAX_CLIENTS)
+        # 請求類型 -> handler，不需要登入的操作為 handler(conn, req)
+        self.public_handlers: Dict[str, Callable[[socket.socket, Dict], None]] = {
+            "PING": self.handle_ping,
+            "REGISTER": self.handle_register,
+            "LOGIN": self.handle_login,
+        }
+        # 需要登入的操作為 handler(conn, session, req)
+        self.handlers: Dict[str, Callable[[socket.socket, DeveloperSession, Dict], None]] = {
+            "LIST_GAMES": self.handle_list_games,
+            "GET_GAME_REVIEWS": self.handle_get_game_reviews,
+            "CREATE_GAME": self.handle_create_game,        # Use Case D1
+            "UPDATE_GAME": self.handle_update_game,
+            "UPLOAD_VERSION": self.handle_upload_version,  # Use Case D2
+            "SET_STATUS": self.handle_set_status,          # Use Case D3
+            "DELETE_GAME": self.handle_delete_game,
+            "LOGOUT": self.handle_logout,
+        }
         self.storage_root.mkdir(parents=True, exist_ok=True)
 
     def serve(self) -> None:
@@ -117,99 +264,103 @@ class DeveloperServer:
             s.bind((self.host, self.port))
             s.listen()
             print(f"[Developer Server] 啟動於 {self.host}:{self.port}")
-            while True:
-                conn, addr = s.accept()
-                threading.Thread(target=self.handle_client, args=(conn, addr), daemon=True).start()
+            try:
+                while True:
+                    conn, addr = s.accept()
+                    if not self._slots.acquire(blocking=False):
+                        self.reject_busy(conn, addr)
+                        continue
+                    self.pool.submit(self.handle_client, conn, addr)
+            finally:
+                self.shutdown()
+
+    def reject_busy(self, conn: socket.socket, addr: Tuple[str, int]) -> None:
+        """所有 worker 都在服務其他連線: 回覆 ERR_SERVER_BUSY 後關閉"""
+        print(f"[Developer Server] 連線數已滿，拒絕 {addr}")
+        try:
+            conn.settimeout(1.0)  # 客戶端不讀取時也不阻塞 accept 迴圈
+            send_frame(conn, ERR_SERVER_BUSY)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def shutdown(self) -> None:
+        """關閉所有客戶端連線並停止 worker (程式結束時 executor 會等待 worker 結束)"""
+        conns = list(self.sessions)
+        for conn in conns:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.pool.shutdown(wait=False, cancel_futures=True)
 
     def handle_client(self, conn: socket.socket, addr: Tuple[str, int]) -> None:
-        """處理單一客戶端連線"""
-        with self.lock:
-            self.sessions[conn] = None
+        """處理單一客戶端連線 (結束時釋放 serve 取得的 _slots)"""
+        self.sessions[conn] = None
         try:
+            # 請求/回應都是小封包，關閉 Nagle 避免與 delayed ACK 疊加造成延遲
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # 偵測未正常關閉的開發者連線，避免 worker thread 永遠卡在 recv
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
             while True:
                 req = recv_json(conn)
                 action = req.get("type")
-                
+
                 # 不需要登入的操作
-                if action == "PING":
-                    send_json(conn, {"ok": True, "pong": True})
-                    continue
-                if action == "REGISTER":
-                    self.handle_register(conn, req)
-                    continue
-                if action == "LOGIN":
-                    self.handle_login(conn, req)
+                handler = self.public_handlers.get(action)
+                if handler is not None:
+                    handler(conn, req)
                     continue
-                    
+
                 # 以下操作需要登入
                 session = self.sessions.get(conn)
                 if session is None:
-                    send_json(conn, {"ok": False, "error": "請先登入"})
+                    send_frame(conn, ERR_NOT_LOGGED_IN)
                     continue
-                    
-                if action == "LIST_GAMES":
-                    # 列出開發者的所有遊戲
-                    games = self.db.call("Game", "list_by_owner", {"ownerId": session.account_id})
-                    versions = {}
-                    for game in games:
-                        gv = self.db.call("GameVersion", "list_by_game", {"gameId": game["id"]})
-                        versions[game["id"]] = gv
-                    send_json(conn, {"ok": True, "games": games, "versions": versions})
-                    
-                elif action == "GET_GAME_REVIEWS":
-                    # 查看遊戲評論
-                    game_id = req.get("gameId")
-                    if not game_id:
-                        send_json(conn, {"ok": False, "error": "請提供 gameId"})
-                        continue
-                    game = self.db.call("Game", "read", {"id": game_id})
-                    if not game:
-                        send_json(conn, {"ok": False, "error": "找不到遊戲"})
-                        continue
-                    if game.get("owner_id") != session.account_id:
-                        send_json(conn, {"ok": False, "error": "無權限查看"})
-                        continue
-                    reviews = self.db.call("GameReview", "list_by_game", {"gameId": game_id})
-                    send_json(conn, {"ok": True, "reviews": reviews})
-                    
-                elif action == "CREATE_GAME":
-                    # Use Case D1: 建立新遊戲
-                    self.handle_create_game(conn, session, req)
-                    
-                elif action == "UPDATE_GAME":
-                    # 更新遊戲資訊
-                    self.handle_update_game(conn, session, req)
-                    
-                elif action == "UPLOAD_VERSION":
-                    # Use Case D2: 上傳新版本
-                    self.handle_upload_version(conn, session, req)
-                    
-                elif action == "SET_STATUS":
-                    # Use Case D3: 設定遊戲狀態 (published/retired)
-                    self.handle_set_status(conn, session, req)
-                
-                elif action == "DELETE_GAME":
-                    # 刪除遊戲
-                    self.handle_delete_game(conn, session, req)
-                    
-                elif action == "LOGOUT":
-                    with self.lock:
-                        self.sessions[conn] = None
-                    send_json(conn, {"ok": True})
-                    
-                else:
+
+                handler = self.handlers.get(action)
+                if handler is None:
                     send_json(conn, {"ok": False, "error": f"未知的操作: {action}"})
-                    
+                    continue
+                handler(conn, session, req)
+
         except Exception as exc:
             print(f"[Developer Server] 連線錯誤 {addr}: {exc}")
         finally:
-            with self.lock:
-                self.sessions.pop(conn, None)
+            session = self.sessions.pop(conn, None)
+            if session:
+                with self.lock:
+                    self.logged_in.pop(session.account_id, None)
             conn.close()
+            self._slots.release()
 
     # ============================================================
     # 帳號相關 Handler
     # ============================================================
+    def get_account(self, username: str) -> Optional[Dict[str, Any]]:
+        """依 username 取得開發者帳號，ACCOUNT_CACHE_TTL 秒內重複查詢直接使用快取"""
+        now = time.monotonic()
+        with self._acct_lock:
+            cached = self._acct_cache.get(username)
+        if cached and now - cached[0] < ACCOUNT_CACHE_TTL:
+            return cached[1]
+        account = self.db.call("DeveloperAccount", "read_by_username", {"username": username})
+        # 只快取存在的帳號，避免註冊後仍讀到「不存在」
+        if account:
+            with self._acct_lock:
+                self._acct_cache[username] = (now, account)
+        return account
+
+    def invalidate_account(self, username: str) -> None:
+        """帳號資料變更後移除快取"""
+        with self._acct_lock:
+            self._acct_cache.pop(username, None)
+
+    def handle_ping(self, conn: socket.socket, req: Dict) -> None:
+        """連線檢查"""
+        send_frame(conn, PONG_RESPONSE)
+
     def handle_register(self, conn: socket.socket, req: Dict) -> None:
         """處理開發者註冊"""
         username = req.get("username")
@@ -217,13 +368,13 @@ class DeveloperServer:
         display_name = req.get("displayName") or username
         
         if not username or not password_hash:
-            send_json(conn, {"ok": False, "error": "請提供帳號和密碼"})
+            send_frame(conn, ERR_MISSING_CREDENTIALS)
             return
             
         # 檢查帳號是否已存在
-        existing = self.db.call("DeveloperAccount", "read_by_username", {"username": username})
+        existing = self.get_account(username)
         if existing:
-            send_json(conn, {"ok": False, "error": "帳號已被使用"})
+            send_frame(conn, ERR_USERNAME_TAKEN)
             return
             
         new = self.db.call(
@@ -238,29 +389,40 @@ class DeveloperServer:
         password_hash = req.get("passwordHash")
         
         if not username or not password_hash:
-            send_json(conn, {"ok": False, "error": "請提供帳號和密碼"})
+            send_frame(conn, ERR_MISSING_CREDENTIALS)
             return
             
-        account = self.db.call("DeveloperAccount", "read_by_username", {"username": username})
+        account = self.get_account(username)
         if not account:
-            send_json(conn, {"ok": False, "error": "帳號或密碼錯誤"})
+            send_frame(conn, ERR_BAD_CREDENTIALS)
             return
         if account["password_hash"] != password_hash:
-            send_json(conn, {"ok": False, "error": "帳號或密碼錯誤"})
+            send_frame(conn, ERR_BAD_CREDENTIALS)
             return
         
         # 檢查是否已經有其他連線登入此帳號（禁止重複登入）
+        # 檢查與佔用在同一次上鎖內完成，避免兩個連線同時登入同一帳號
         with self.lock:
-            for existing_conn, existing_session in self.sessions.items():
-                if existing_session and existing_session.account_id == account["id"]:
-                    send_json(conn, {"ok": False, "error": "This account is already logged in from another session"})
-                    return
-            
-        self.db.call("DeveloperAccount", "set_last_login", {"id": account["id"]})
+            if self.logged_in.get(account["id"], conn) is not conn:
+                send_frame(conn, ERR_ALREADY_LOGGED_IN)
+                return
+            self.logged_in[account["id"]] = conn
+        
+        try:
+            self.db.call("DeveloperAccount", "set_last_login", {"id": account["id"]})
+        except Exception:
+            with self.lock:
+                self.logged_in.pop(account["id"], None)
+            raise
+        self.invalidate_account(username)
         session = DeveloperSession(account["id"], account["username"], account["display_name"])
         
-        with self.lock:
-            self.sessions[conn] = session
+        previous = self.sessions.get(conn)
+        if previous and previous.account_id != session.account_id:
+            # 同一連線改登入其他帳號，釋放原帳號
+            with self.lock:
+                self.logged_in.pop(previous.account_id, None)
+        self.sessions[conn] = session
             
         send_json(conn, {
             "ok": True,
@@ -272,9 +434,49 @@ class DeveloperServer:
             },
         })
 
+    def handle_logout(self, conn: socket.socket, session: DeveloperSession, req: Dict) -> None:
+        """處理登出，釋放帳號的登入狀態"""
+        self.sessions[conn] = None
+        with self.lock:
+            self.logged_in.pop(session.account_id, None)
+        send_frame(conn, OK_RESPONSE)
+
     # ============================================================
     # 遊戲管理 Handler (Use Case D1-D3)
     # ============================================================
+    def check_owner(self, conn: socket.socket, session: DeveloperSession, game_id: int, denied: str) -> bool:
+        """確認遊戲存在且屬於目前開發者，否則回傳錯誤訊息"""
+        owner = self.db.call("Game", "check_owner", {"id": game_id, "ownerId": session.account_id})
+        if not owner["exists"]:
+            send_frame(conn, ERR_GAME_NOT_FOUND)
+            return False
+        if not owner["owned"]:
+            send_json(conn, {"ok": False, "error": denied})
+            return False
+        return True
+
+    def handle_list_games(self, conn: socket.socket, session: DeveloperSession, req: Dict) -> None:
+        """列出開發者的所有遊戲與各遊戲的版本"""
+        # 結果只是轉送給客戶端，直接拼接 DB Server 回傳的 JSON，不解碼再編碼
+        games = self.db.call_raw("Game", "list_by_owner", {"ownerId": session.account_id})
+        versions = self.db.call_raw("GameVersion", "list_by_owner", {"ownerId": session.account_id})
+        send_frame(conn, b'{"ok":true,"games":' + games + b',"versions":' + versions + b"}")
+
+    def handle_get_game_reviews(self, conn: socket.socket, session: DeveloperSession, req: Dict) -> None:
+        """查看遊戲評論 (僅限遊戲擁有者)"""
+        game_id = req.get("gameId")
+        if not game_id:
+            send_frame(conn, ERR_MISSING_GAME_ID)
+            return
+        result = self.db.call("GameReview", "list_by_game_for_owner", {"gameId": game_id, "ownerId": session.account_id})
+        if not result["exists"]:
+            send_frame(conn, ERR_GAME_NOT_FOUND)
+            return
+        if not result["owned"]:
+            send_frame(conn, ERR_REVIEWS_DENIED)
+            return
+        send_json(conn, {"ok": True, "reviews": result["reviews"]})
+
     def handle_create_game(self, conn: socket.socket, session: DeveloperSession, req: Dict) -> None:
         """Use Case D1: 建立新遊戲"""
         title = req.get("title", "").strip()
@@ -309,16 +511,11 @@ class DeveloperServer:
         """更新遊戲資訊"""
         game_id = req.get("gameId")
         if not game_id:
-            send_json(conn, {"ok": False, "error": "請提供 gameId"})
+            send_frame(conn, ERR_MISSING_GAME_ID)
             return
         
         # 驗證擁有權
-        game = self.db.call("Game", "read", {"id": game_id})
-        if not game:
-            send_json(conn, {"ok": False, "error": "找不到遊戲"})
-            return
-        if game.get("owner_id") != session.account_id:
-            send_json(conn, {"ok": False, "error": "無權限更新此遊戲"})
+        if not self.check_owner(conn, session, game_id, "無權限更新此遊戲"):
             return
         
         data = {"id": game_id}
@@ -327,40 +524,30 @@ class DeveloperServer:
             if key in req:
                 data[key] = req[key]
         self.db.call("Game", "update", data)
-        send_json(conn, {"ok": True})
+        send_frame(conn, OK_RESPONSE)
 
     def handle_set_status(self, conn: socket.socket, session: DeveloperSession, req: Dict) -> None:
         """Use Case D3: 設定遊戲狀態 (published=上架, retired=下架)"""
         game_id = req.get("gameId")
         if not game_id:
-            send_json(conn, {"ok": False, "error": "請提供 gameId"})
+            send_frame(conn, ERR_MISSING_GAME_ID)
             return
         
-        game = self.db.call("Game", "read", {"id": game_id})
-        if not game:
-            send_json(conn, {"ok": False, "error": "找不到遊戲"})
-            return
-        if game.get("owner_id") != session.account_id:
-            send_json(conn, {"ok": False, "error": "無權限修改此遊戲"})
+        if not self.check_owner(conn, session, game_id, "無權限修改此遊戲"):
             return
         
         new_status = req.get("status", "draft")
         self.db.call("Game", "update", {"id": game_id, "status": new_status})
-        send_json(conn, {"ok": True})
+        send_frame(conn, OK_RESPONSE)
 
     def handle_delete_game(self, conn: socket.socket, session: DeveloperSession, req: Dict) -> None:
         """刪除遊戲及其所有版本"""
         game_id = req.get("gameId")
         if not game_id:
-            send_json(conn, {"ok": False, "error": "請提供 gameId"})
+            send_frame(conn, ERR_MISSING_GAME_ID)
             return
         
-        game = self.db.call("Game", "read", {"id": game_id})
-        if not game:
-            send_json(conn, {"ok": False, "error": "找不到遊戲"})
-            return
-        if game.get("owner_id") != session.account_id:
-            send_json(conn, {"ok": False, "error": "無權限刪除此遊戲"})
+        if not self.check_owner(conn, session, game_id, "無權限刪除此遊戲"):
             return
         
         # 刪除遊戲 (會連帶刪除版本、評論等)
@@ -368,41 +555,78 @@ class DeveloperServer:
             self.db.call("Game", "delete", {"id": game_id})
             
             # 刪除本地儲存的遊戲檔案
+            self._known_folders.discard(game_id)
             game_folder = self.storage_root / f"game_{game_id}"
             if game_folder.exists():
                 import shutil
                 shutil.rmtree(game_folder, ignore_errors=True)
             
-            send_json(conn, {"ok": True})
+            send_frame(conn, OK_RESPONSE)
         except Exception as exc:
             send_json(conn, {"ok": False, "error": f"刪除失敗: {exc}"})
 
     def handle_upload_version(self, conn: socket.socket, session: DeveloperSession, req: Dict) -> None:
         """Use Case D1/D2: 上傳遊戲版本"""
+        # 套件可用兩種方式傳送:
+        # - packageSize: 原始位元組以獨立 frame 緊接在請求之後，邊收邊寫入檔案
+        # - package: base64 字串 (舊版客戶端)
+        package: Optional[Iterator[bytes]] = None
+        if "package" not in req and "packageSize" in req:
+            package = recv_frame_chunks(conn)
+        try:
+            self.store_version(conn, session, req, package)
+        finally:
+            # 驗證失敗時套件尚未讀取，需丟棄以免殘留在連線中
+            if package is not None:
+                for _ in package:
+                    pass
+
+    def store_version(
+        self, conn: socket.socket, session: DeveloperSession, req: Dict, package: Optional[Iterator[bytes]]
+    ) -> None:
+        """驗證上傳資訊並儲存套件、建立版本記錄"""
         try:
             game_id = req["gameId"]
             version_label = req["versionLabel"]
             client_entry = req["clientEntrypoint"]
             server_entry = req["serverEntrypoint"]
             client_mode = req.get("clientMode", "gui").lower()
-            package_b64 = req["package"]
+            package_b64 = req["package"] if package is None else None
         except KeyError as missing:
             send_json(conn, {"ok": False, "error": f"缺少必要欄位: {missing}"})
             return
         
+        # 先做不需查詢 DB 的檢查，再檢查擁有權與版本重複，全部通過後才解碼/寫入套件
         # 驗證版本標籤
         if not version_label or not version_label.strip():
             send_json(conn, {"ok": False, "error": "版本標籤不可為空"})
             return
         version_label = version_label.strip()
         
-        # 驗證遊戲擁有權
-        game = self.db.call("Game", "read", {"id": game_id})
-        if not game:
-            send_json(conn, {"ok": False, "error": "找不到遊戲"})
+        if client_mode not in {"cli", "gui"}:
+            send_json(conn, {"ok": False, "error": "clientMode 必須是 cli 或 gui"})
+            return
+        
+        # 串流上傳可選擇以 zlib 壓縮傳輸，儲存與 hash 仍以原始 zip 為準
+        compression = req.get("compression")
+        if compression is not None and (compression != "zlib" or package is None):
+            send_json(conn, {"ok": False, "error": f"不支援的壓縮方式: {compression}"})
             return
-        if game.get("owner_id") != session.account_id:
-            send_json(conn, {"ok": False, "error": "無權限上傳此遊戲"})
+        
+        if package is None and not package_b64:
+            send_frame(conn, ERR_EMPTY_PACKAGE)
+            return
+        
+        # 串流大小由客戶端宣告，需在任何 DB 查詢與寫入前驗證型別與上限
+        expected = req.get("packageSize") if package is not None else None
+        if package is not None and (
+            not isinstance(expected, int) or isinstance(expected, bool) or not 0 < expected <= MAX_PACKAGE_SIZE
+        ):
+            send_frame(conn, ERR_INVALID_PACKAGE_SIZE)
+            return
+        
+        # 驗證擁有權
+        if not self.check_owner(conn, session, game_id, "無權限上傳此遊戲"):
             return
         
         # 檢查版本是否已存在
@@ -412,32 +636,79 @@ class DeveloperServer:
                 send_json(conn, {"ok": False, "error": f"版本 '{version_label}' 已存在，請使用其他版本號"})
                 return
         
-        if client_mode not in {"cli", "gui"}:
-            send_json(conn, {"ok": False, "error": "clientMode 必須是 cli 或 gui"})
-            return
-        
-        # 解碼並儲存檔案
-        raw = base64.b64decode(package_b64.encode("ascii"))
-        if len(raw) == 0:
-            send_json(conn, {"ok": False, "error": "上傳的檔案是空的"})
-            return
-            
-        sha = hashlib.sha256(raw).hexdigest()
-        folder = self.storage_root / f"game_{game_id}"
-        folder.mkdir(parents=True, exist_ok=True)
+        folder = os.path.join(self._storage_dir, f"game_{game_id}")
+        if game_id not in self._known_folders:
+            os.makedirs(folder, exist_ok=True)
+            self._known_folders.add(game_id)
         filename = f"{int(time.time())}_{version_label.replace('/', '_')}.zip"
-        path = folder / filename
+        path = os.path.join(folder, filename)
         
-        with open(path, "wb") as fp:
-            fp.write(raw)
+        hasher = hashlib.sha256()
+        size = 0
+        if package is None:
+            # 舊版: 解碼 base64 後寫入
+            raw = base64.b64decode(package_b64.encode("ascii"))
+            if len(raw) == 0:
+                send_frame(conn, ERR_EMPTY_PACKAGE)
+                return
+            hasher.update(raw)
+            size = len(raw)
+            # 無緩衝寫入: 直接交給 OS，不再複製到 BufferedWriter
+            with open(path, "wb", buffering=0) as fp:
+                write_fully(fp, raw)
+        else:
+            # 串流: 每個區塊 (解壓後) 同時計算 hash 並寫入檔案
+            decompressor = zlib.decompressobj() if compression else None
+            try:
+                # 每個區塊本身已是完整 bytes，無緩衝直接寫入
+                # 預先配置空間只使用已驗證並受 MAX_PACKAGE_SIZE 限制的宣告大小
+                with open(path, "wb", buffering=0) as fp:
+                    if hasattr(os, "posix_fallocate"):
+                        try:
+                            os.posix_fallocate(fp.fileno(), 0, expected)
+                        except OSError:
+                            pass
+                    for chunk in package:
+                        if decompressor:
+                            # 每次最多解壓到超過宣告大小 1 byte 為止，壓縮炸彈不會先展開整個區塊
+                            chunk = decompressor.decompress(chunk, expected - size + 1)
+                            if decompressor.unconsumed_tail:
+                                size = -1
+                                break
+                        hasher.update(chunk)
+                        write_fully(fp, chunk)
+                        size += len(chunk)
+                        if size > expected:
+                            break
+                    if decompressor and 0 <= size <= expected:
+                        tail = decompressor.flush()
+                        hasher.update(tail)
+                        write_fully(fp, tail)
+                        size += len(tail)
+            except zlib.error:
+                size = -1
+            if size != expected:
+                os.unlink(path)
+                send_json(conn, {"ok": False, "error": "上傳的檔案大小不符"})
+                return
+        sha = hasher.hexdigest()
+        
+        # 與既有版本內容完全相同 (重複上傳同一個 zip) 時共用已儲存的檔案
+        for v in existing_versions:
+            if v.get("package_sha256") == sha and v.get("package_size") == size:
+                previous = v["package_path"]
+                if os.path.exists(previous):
+                    os.unlink(path)
+                    path = previous
+                    break
         
         # 建立版本記錄
         record = self.db.call("GameVersion", "create", {
             "gameId": game_id,
             "versionLabel": version_label,
             "changelog": req.get("changelog", ""),
-            "packagePath": str(path),
-            "packageSize": len(raw),
+            "packagePath": path,
+            "packageSize": size,
             "packageSha256": sha,
             "clientEntrypoint": client_entry,
             "serverEntrypoint": server_entry,
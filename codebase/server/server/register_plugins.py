@@ -14,12 +14,24 @@ from typing import Any, Dict
 # 添加 common 路徑
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from common.lp import send_json, recv_json
+from common.lp import CHUNK_SIZE, send_json, recv_json
 
 PLUGINS_SOURCE = Path(__file__).parent / "storage" / "plugins"
 PLUGINS_STORAGE = Path(__file__).parent / "storage" / "plugins"
+# 已壓縮過的檔案格式，再以 deflate 壓縮幾乎沒有效果，直接儲存
+INCOMPRESSIBLE_SUFFIXES = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".mp3", ".ogg", ".mp4", ".zip", ".gz", ".xz", ".woff2",
+})
 
-def package_plugin(plugin_dir: Path) -> tuple[bytes, Dict[str, Any]]:
+def file_sha256(path: Path) -> str:
+    """分段讀取檔案計算 sha256，不需把整個檔案讀入記憶體"""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def package_plugin(plugin_dir: Path) -> Dict[str, Any]:
     """
     打包 Plugin 目錄為 zip 並返回 metadata
     """
@@ -37,17 +49,16 @@ def package_plugin(plugin_dir: Path) -> tuple[bytes, Dict[str, Any]]:
             if file.suffix == '.zip':
                 continue
             if file.is_file():
-                zf.write(file, file.name)
-    
-    # 計算 hash
-    zip_data = zip_path.read_bytes()
-    sha256 = hashlib.sha256(zip_data).hexdigest()
+                if file.suffix.lower() in INCOMPRESSIBLE_SUFFIXES:
+                    zf.write(file, file.name, compress_type=zipfile.ZIP_STORED)
+                else:
+                    zf.write(file, file.name)
     
-    return zip_data, {
+    return {
         **metadata,
         "package_path": str(zip_path.resolve()),
-        "package_size": len(zip_data),
-        "package_sha256": sha256,
+        "package_size": zip_path.stat().st_size,
+        "package_sha256": file_sha256(zip_path),
     }
 
 def register_plugin_to_db(db_host: str, db_port: int, plugin_info: Dict[str, Any]) -> bool:
@@ -105,7 +116,7 @@ def main():
     for plugin_dir in plugins_to_process:
         try:
             print(f"Processing plugin: {plugin_dir.name}")
-            _, plugin_info = package_plugin(plugin_dir)
+            plugin_info = package_plugin(plugin_dir)
             
             print(f"  Name: {plugin_info['name']}")
             print(f"  Version: {plugin_info['version']}")
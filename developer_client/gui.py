@@ -18,19 +18,22 @@
 
 作者: HW3 作業
 """
-import base64
 import hashlib
 import json
 import os
 import socket
 import threading
 import tkinter as tk
+import zlib
 from dataclasses import dataclass
 from pathlib import Path
 from tkinter import filedialog, messagebox, ttk
 from typing import Any, Dict, List, Optional
 
-from common.lp import recv_json, send_json
+from common.lp import recv_json, send_frame, send_json
+
+# 上傳套件壓縮後至少要小於原始大小的此比例才改用壓縮傳送
+COMPRESS_MAX_RATIO = 0.9
 
 
 @dataclass
@@ -72,6 +75,24 @@ class DeveloperConnection:
             send_json(self.sock, payload)
             return recv_json(self.sock)
 
+    def call_with_blob(self, payload: Dict[str, Any], blob: bytes) -> Dict[str, Any]:
+        """
+        發送 Request 並緊接著以 raw frame 傳送二進位資料 (不經 base64)
+        若 zlib 壓縮後明顯變小 (例如含大量原始碼的套件) 則以壓縮格式傳送
+        """
+        header = {**payload, "packageSize": len(blob)}
+        body = zlib.compress(blob)
+        if len(body) <= len(blob) * COMPRESS_MAX_RATIO:
+            header["compression"] = "zlib"
+        else:
+            body = blob
+        with self.lock:
+            if not self.sock:
+                raise RuntimeError("connection not established")
+            send_json(self.sock, header)
+            send_frame(self.sock, body)
+            return recv_json(self.sock)
+
 
 def hash_password(password: str) -> str:
     """密碼 SHA256 雜湊，不以明文傳輸"""
@@ -592,11 +613,10 @@ class DeveloperApp(tk.Tk):
                 "serverEntrypoint": server_entry,
                 "clientMode": client_mode,
                 "changelog": changelog_var.get().strip() or "",
-                "package": base64.b64encode(data).decode("ascii"),
             }
             
             try:
-                resp = self.conn.call(payload)
+                resp = self.conn.call_with_blob(payload, data)
             except Exception as exc:
                 status_var.set("")
                 # Connection error - offer retry
@@ -982,7 +1002,7 @@ class DeveloperApp(tk.Tk):
             
             # Step 3: Upload version
             try:
-                upload_resp = self.conn.call({
+                upload_resp = self.conn.call_with_blob({
                     "type": "UPLOAD_VERSION",
                     "gameId": game_id,
                     "versionLabel": version,
@@ -990,8 +1010,7 @@ class DeveloperApp(tk.Tk):
                     "serverEntrypoint": server_entry,
                     "clientMode": client_mode_var.get() or "gui",
                     "changelog": changelog_var.get().strip(),
-                    "package": base64.b64encode(data).decode("ascii"),
-                })
+                }, data)
             except Exception as exc:
                 status_var.set("")
                 messagebox.showerror("Upload Failed", f"Failed to upload version: {exc}\n\nGame was created but no version uploaded.", parent=dialog)
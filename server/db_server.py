@@ -34,15 +34,19 @@ API 格式:
 import argparse
 import hashlib
 import json
+import logging
+import logging.handlers
+import queue
 import sqlite3
 import socket
+import sys
 import threading
 import time
 import zipfile
 from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
-from common.lp import recv_json, send_json
+from common.lp import CHUNK_SIZE, decode_json, encode_json, recv_json, send_frame, send_json
 
 # ============================================================
 # 常數定義
@@ -50,6 +54,49 @@ from common.lp import recv_json, send_json
 # Plugin 儲存路徑 (伺服器端)
 PLUGINS_STORAGE = Path(__file__).parent / "storage" / "plugins"
 
+# Game.update 可更新的欄位 (API 欄位名稱 -> 資料表欄位)
+GAME_UPDATE_COLUMNS: Dict[str, str] = {
+    "title": "title",
+    "summary": "summary",
+    "category": "category",
+    "status": "status",
+    "minPlayers": "min_players",
+    "maxPlayers": "max_players",
+    "supportCli": "support_cli",
+    "supportGui": "support_gui",
+    "latestVersionId": "latest_version_id",
+}
+
+# 預先編碼的固定錯誤回應
+ERR_MISSING_ENTITY_ACTION = encode_json({"ok": False, "error": "缺少 entity 或 action"})
+
+# 請求日誌佇列上限，滿了就丟棄新日誌，避免拖慢請求處理
+LOG_QUEUE_SIZE = 10000
+
+logger = logging.getLogger("db_server")
+
+# 登入 Session 的有效時間 (秒): Lobby Server 超過此時間未更新 last_seen_at 的 Session 視為失效，
+# 其他 Lobby Server 可直接接手 (Lobby Server 當機、更換位址或釋放失敗時不會永久鎖住帳號)
+SESSION_TTL = 90
+
+# 列表查詢的分頁大小 (預設 / 上限)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Plugin upsert 語句 (自動註冊與 Plugin.upsert 共用同一份 SQL 文字)
+_PLUGIN_UPSERT_SQL = """
+INSERT INTO plugins(slug, name, description, latest_version, package_path, package_size, package_sha256, created_at, updated_at)
+VALUES(?,?,?,?,?,?,?,?,?)
+ON CONFLICT(slug) DO UPDATE SET
+    name=excluded.name,
+    description=excluded.description,
+    latest_version=excluded.latest_version,
+    package_path=excluded.package_path,
+    package_size=excluded.package_size,
+    package_sha256=excluded.package_sha256,
+    updated_at=excluded.updated_at
+"""
+
 # ============================================================
 # 資料庫 Schema 定義
 # 
@@ -85,9 +132,25 @@ SCHEMA_STATEMENTS: List[str] = [
         locked INTEGER NOT NULL DEFAULT 0
     );
     """,
+    # 玩家登入 Session 表
+    # - 每位玩家最多一筆 (player_id 為主鍵)，用於禁止重複登入，多台 Lobby Server 共用
+    # - server_id: 持有此 Session 的 Lobby Server (host:port)，重新啟動時清除自己的舊紀錄
+    # - last_seen_at: Lobby Server 定期更新，超過 SESSION_TTL 未更新即可被重新登入接手
+    """
+    CREATE TABLE IF NOT EXISTS player_sessions (
+        player_id INTEGER PRIMARY KEY,
+        server_id TEXT NOT NULL,
+        token TEXT NOT NULL,
+        created_at INTEGER NOT NULL,
+        last_seen_at INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY(player_id) REFERENCES player_accounts(id)
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_player_sessions_server ON player_sessions(server_id);",
     # 遊戲表 (Game)
     # - status: draft=草稿, published=已上架, retired=已下架
     # - 用於 Use Case D1 (上架), D2 (更新), D3 (下架)
+    # - rating_sum/rating_count: 評分彙總，由 GameReview.upsert 維護
     """
     CREATE TABLE IF NOT EXISTS games (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -103,9 +166,15 @@ SCHEMA_STATEMENTS: List[str] = [
         support_cli INTEGER NOT NULL DEFAULT 1,
         support_gui INTEGER NOT NULL DEFAULT 1,
         latest_version_id INTEGER,
+        rating_sum REAL NOT NULL DEFAULT 0,
+        rating_count INTEGER NOT NULL DEFAULT 0,
         FOREIGN KEY(owner_id) REFERENCES developer_accounts(id)
     );
     """,
+    # 商城首頁依狀態與更新時間列出遊戲
+    """
+    CREATE INDEX IF NOT EXISTS ix_games_status_updated ON games(status, updated_at);
+    """,
     # 遊戲版本表 (GameVersion)
     # - 儲存遊戲的各個版本套件
     # - 支援版本更新與回滾 (Use Case D2)
@@ -247,10 +316,64 @@ SCHEMA_STATEMENTS: List[str] = [
         FOREIGN KEY(room_id) REFERENCES rooms(id),
         FOREIGN KEY(player_id) REFERENCES player_accounts(id)
     );
+    """,
+    # 刪除遊戲時連帶刪除評論、版本與房間 (由 SQLite 在同一個語句內完成)
+    # - 使用 trigger 而非 ON DELETE CASCADE: 既有資料庫的表格無法補上外鍵子句，
+    #   且開啟 PRAGMA foreign_keys 會讓其他未處理的參照 (如 player_downloads) 刪除失敗
     """
+    CREATE TRIGGER IF NOT EXISTS trg_games_delete AFTER DELETE ON games
+    BEGIN
+        DELETE FROM game_reviews WHERE game_id=OLD.id;
+        DELETE FROM game_versions WHERE game_id=OLD.id;
+        DELETE FROM rooms WHERE game_id=OLD.id;
+    END;
+    """,
+    # 刪除房間時連帶清除成員、邀請與聊天記錄
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_rooms_delete AFTER DELETE ON rooms
+    BEGIN
+        DELETE FROM room_members WHERE room_id=OLD.id;
+        DELETE FROM invites WHERE room_id=OLD.id;
+        DELETE FROM room_chat WHERE room_id=OLD.id;
+    END;
+    """,
 ]
 
 
+# ============================================================
+# 非同步日誌
+# ============================================================
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    將日誌放入有界佇列，由背景執行緒輸出
+
+    - 不在請求執行緒格式化訊息 (%s 參數延後到背景執行緒才展開)
+    - 佇列已滿時直接丟棄，不阻塞請求
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """設定 DB Server 日誌：請求執行緒只負責入列，輸出交給 QueueListener"""
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_QUEUE_SIZE)
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, stream)
+    logger.addHandler(DroppingQueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    listener.start()
+    return listener
+
+
 # ============================================================
 # SQLite 適配器
 # ============================================================
@@ -261,12 +384,35 @@ class SQLiteAdapter:
         self.path = path
         self.conn = sqlite3.connect(str(path), check_same_thread=False)
         self.conn.row_factory = sqlite3.Row
+        # 舊版資料庫的 games 表缺少評分彙總欄位，需先補上才能建立其餘 Schema
+        self.migrate()
         # 初始化所有 Schema
         cur = self.conn.cursor()
         for stmt in SCHEMA_STATEMENTS:
             cur.executescript(stmt)
         self.conn.commit()
 
+    def migrate(self) -> None:
+        """為既有資料庫補上新增的欄位"""
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(player_sessions)")}
+        if columns and "last_seen_at" not in columns:
+            # 舊紀錄的 last_seen_at 為 0，視為已失效
+            self.conn.execute("ALTER TABLE player_sessions ADD COLUMN last_seen_at INTEGER NOT NULL DEFAULT 0")
+            self.conn.commit()
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(games)")}
+        if not columns or "rating_sum" in columns:
+            return
+        self.conn.executescript(
+            """
+            ALTER TABLE games ADD COLUMN rating_sum REAL NOT NULL DEFAULT 0;
+            ALTER TABLE games ADD COLUMN rating_count INTEGER NOT NULL DEFAULT 0;
+            UPDATE games SET
+                rating_sum = IFNULL((SELECT SUM(rating) FROM game_reviews WHERE game_id=games.id), 0),
+                rating_count = (SELECT COUNT(*) FROM game_reviews WHERE game_id=games.id);
+            """
+        )
+        self.conn.commit()
+
     def row_to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
         """將 Row 物件轉換為 dict"""
         return {k: row[k] for k in row.keys()}
@@ -277,6 +423,12 @@ class SQLiteAdapter:
         cur.execute(sql, params)
         return cur
 
+    def executemany(self, sql: str, rows: List[Tuple[Any, ...]]) -> sqlite3.Cursor:
+        """以同一個語句執行多組參數 (批次寫入)"""
+        cur = self.conn.cursor()
+        cur.executemany(sql, rows)
+        return cur
+
     def commit(self) -> None:
         """提交交易"""
         self.conn.commit()
@@ -296,6 +448,8 @@ class DBServer:
         self.host = host
         self.port = port
         self.db = SQLiteAdapter(db_path)
+        # 依更新欄位組合快取 UPDATE 語句，讓相同組合重用 SQLite 的 prepared statement
+        self._update_sql_cache: Dict[frozenset[str], str] = {}
 
     def serve(self) -> None:
         """啟動伺服器，監聽連線"""
@@ -309,6 +463,9 @@ class DBServer:
             print(f"[DB Server] 啟動於 {self.host}:{self.port}")
             while True:
                 conn, addr = s.accept()
+                # 查詢回應多為小封包，關閉 Nagle；keepalive 偵測失效的 Server 端連線
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
                 threading.Thread(target=self.handle_client, args=(conn, addr), daemon=True).start()
 
     def _auto_register_plugins(self) -> None:
@@ -341,42 +498,33 @@ class DBServer:
         
         metadata = json.loads(plugin_json.read_text(encoding="utf-8"))
         
-        # 創建 zip 包
+        # 創建 zip 包 (不壓縮: 每次啟動都會重新打包，且只在本機與 Lobby 間傳遞)
         zip_path = plugin_dir / f"{metadata['slug']}.zip"
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zf:
             for file in plugin_dir.iterdir():
                 if file.suffix == '.zip':
                     continue
                 if file.is_file():
                     zf.write(file, file.name)
         
-        # 計算 hash
-        zip_data = zip_path.read_bytes()
-        sha256 = hashlib.sha256(zip_data).hexdigest()
+        # 分段計算 hash，不需把整個 zip 讀入記憶體
+        hasher = hashlib.sha256()
+        with open(zip_path, "rb") as fp:
+            for chunk in iter(lambda: fp.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
         
         return {
             **metadata,
             "package_path": str(zip_path.resolve()),
-            "package_size": len(zip_data),
-            "package_sha256": sha256,
+            "package_size": zip_path.stat().st_size,
+            "package_sha256": hasher.hexdigest(),
         }
     
     def _register_plugin(self, plugin_info: Dict[str, Any]) -> None:
         """將 Plugin 資訊寫入資料庫"""
         now = self.now()
         self.db.exec(
-            """
-            INSERT INTO plugins(slug, name, description, latest_version, package_path, package_size, package_sha256, created_at, updated_at)
-            VALUES(?,?,?,?,?,?,?,?,?)
-            ON CONFLICT(slug) DO UPDATE SET
-                name=excluded.name,
-                description=excluded.description,
-                latest_version=excluded.latest_version,
-                package_path=excluded.package_path,
-                package_size=excluded.package_size,
-                package_sha256=excluded.package_sha256,
-                updated_at=excluded.updated_at
-            """,
+            _PLUGIN_UPSERT_SQL,
             (
                 plugin_info["slug"],
                 plugin_info["name"],
@@ -401,15 +549,15 @@ class DBServer:
                 payload = req.get("data") or {}
                 
                 if not entity or not action:
-                    send_json(conn, {"ok": False, "error": "缺少 entity 或 action"})
+                    send_frame(conn, ERR_MISSING_ENTITY_ACTION)
                     continue
                 
                 # 顯示關鍵操作日誌
-                if entity in ("PlayerAccount", "DeveloperAccount") and action in ("create", "set_last_login"):
+                if entity in ("PlayerAccount", "DeveloperAccount") and action in ("create", "set_last_login", "try_acquire_session"):
                     username = payload.get("username", payload.get("id", "?"))
-                    print(f"[DB] {entity}.{action} -> {username}")
+                    logger.info("[DB] %s.%s -> %s", entity, action, username)
                 elif entity in ("Room", "RoomMember", "Invite", "Game", "GameVersion"):
-                    print(f"[DB] {entity}.{action} -> {payload}")
+                    logger.info("[DB] %s.%s -> %s", entity, action, payload)
                     
                 try:
                     # 動態取得 handler (例如 handle_game, handle_room 等)
@@ -447,6 +595,61 @@ class DBServer:
         rows = cur.fetchall()
         return [self.db.row_to_dict(r) for r in rows]
 
+    def page_clause(
+        self, data: Dict[str, Any], sort_col: str, id_col: str, cursor_key: str = "beforeUpdatedAt"
+    ) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        產生 keyset 分頁條件
+
+        依 (sort_col, id_col) 由新到舊排序，呼叫端傳入上一頁最後一筆的
+        cursor_key (預設 beforeUpdatedAt) / beforeId 即可取得下一頁 (不使用 OFFSET)
+
+        未傳入 limit 也未傳入 cursor 時不加 LIMIT，維持舊版回傳完整清單的行為
+        (舊客戶端不會翻頁，截斷會讓多出來的資料直接消失)
+
+        Returns:
+            (SQL 片段, 參數): 片段以 AND 開頭，包含 ORDER BY 與 (分頁時的) LIMIT
+        """
+        before = data.get(cursor_key)
+        if before is None and data.get("limit") is None:
+            return f" ORDER BY {sort_col} DESC, {id_col} DESC", ()
+        limit = max(1, min(int(data.get("limit") or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+        if before is None:
+            return f" ORDER BY {sort_col} DESC, {id_col} DESC LIMIT ?", (limit,)
+        before_id = data.get("beforeId")
+        if before_id is None:
+            return (
+                f" AND {sort_col} < ? ORDER BY {sort_col} DESC, {id_col} DESC LIMIT ?",
+                (before, limit),
+            )
+        return (
+            f" AND ({sort_col}, {id_col}) < (?, ?) ORDER BY {sort_col} DESC, {id_col} DESC LIMIT ?",
+            (before, before_id, limit),
+        )
+
+    # ============================================================
+    # 批次請求
+    # ============================================================
+    def handle_db(self, action: str, data: Dict[str, Any]) -> Any:
+        """
+        在一次往返中執行多個請求，依序回傳各自的結果
+
+        data: {"calls": [{"entity": ..., "action": ..., "data": {...}}, ...]}
+        任一請求失敗時整批回傳該錯誤 (已執行的寫入不會復原，批次應以查詢為主)
+        """
+        if action != "batch":
+            raise ValueError(f"不支援的 DB 操作: {action}")
+        results = []
+        for call in data["calls"]:
+            entity = call["entity"]
+            if entity == "DB":
+                raise ValueError("批次請求不可巢狀")
+            handler = getattr(self, f"handle_{entity.lower()}", None)
+            if handler is None:
+                raise ValueError(f"未知的 entity: {entity}")
+            results.append(handler(call["action"], call.get("data") or {}))
+        return results
+
     # ============================================================
     # 開發者帳號 Entity Handler
     # ============================================================
@@ -502,6 +705,51 @@ class DBServer:
             self.db.exec("UPDATE player_accounts SET last_login_at=? WHERE id=?", (self.now(), data["id"]))
             self.db.commit()
             return {"ok": True}
+
+        if action == "try_acquire_session":
+            # 佔用登入 Session，玩家已在任一 Lobby Server 登入時失敗 (由主鍵判斷)；
+            # 既有 Session 超過 SESSION_TTL 未更新時視為殘留紀錄，直接接手
+            # 成功時一併更新最後登入時間
+            now = self.now()
+            cur = self.db.exec(
+                """
+                INSERT INTO player_sessions(player_id, server_id, token, created_at, last_seen_at) VALUES(?,?,?,?,?)
+                ON CONFLICT(player_id) DO UPDATE SET
+                    server_id=excluded.server_id,
+                    token=excluded.token,
+                    created_at=excluded.created_at,
+                    last_seen_at=excluded.last_seen_at
+                WHERE player_sessions.last_seen_at < ?
+                """,
+                (data["id"], data["serverId"], data["token"], now, now, now - SESSION_TTL),
+            )
+            acquired = cur.rowcount > 0
+            if acquired:
+                self.db.exec("UPDATE player_accounts SET last_login_at=? WHERE id=?", (now, data["id"]))
+            self.db.commit()
+            return {"acquired": acquired}
+
+        if action == "release_session":
+            # 只刪除同一個 token 的紀錄，避免誤刪之後重新登入的 Session
+            self.db.exec("DELETE FROM player_sessions WHERE player_id=? AND token=?", (data["id"], data["token"]))
+            self.db.commit()
+            return {"ok": True}
+
+        if action == "touch_sessions":
+            # Lobby Server 定期更新仍在線上的 Session: data["sessions"] 為 [[player_id, token], ...]
+            now = self.now()
+            cur = self.db.executemany(
+                "UPDATE player_sessions SET last_seen_at=? WHERE player_id=? AND token=?",
+                [(now, player_id, token) for player_id, token in data["sessions"]],
+            )
+            self.db.commit()
+            return {"touched": cur.rowcount}
+
+        if action == "release_server_sessions":
+            # Lobby Server 啟動時清除上次執行殘留的 Session
+            cur = self.db.exec("DELETE FROM player_sessions WHERE server_id=?", (data["serverId"],))
+            self.db.commit()
+            return {"released": cur.rowcount}
             
         raise ValueError(f"不支援的玩家帳號操作: {action}")
 
@@ -535,45 +783,33 @@ class DBServer:
             self.db.commit()
             return {"id": cur.lastrowid}
         if action == "update":
-            fields = []
-            values: List[Any] = []
-            mapping = {
-                "title": "title",
-                "summary": "summary",
-                "category": "category",
-                "status": "status",
-                "minPlayers": "min_players",
-                "maxPlayers": "max_players",
-                "supportCli": "support_cli",
-                "supportGui": "support_gui",
-                "latestVersionId": "latest_version_id",
-            }
-            for key, column in mapping.items():
-                if key in data:
-                    values.append(data[key])
-                    fields.append(f"{column}=?")
-            if not fields:
+            key = frozenset(k for k in data if k in GAME_UPDATE_COLUMNS)
+            if not key:
                 return {"updated": 0}
+            sql = self._update_sql_cache.get(key)
+            if sql is None:
+                # 欄位順序固定依 GAME_UPDATE_COLUMNS，確保相同組合產生相同 SQL
+                fields = [f"{column}=?" for k, column in GAME_UPDATE_COLUMNS.items() if k in key]
+                fields.append("updated_at=?")
+                sql = f"UPDATE games SET {', '.join(fields)} WHERE id=?"
+                self._update_sql_cache[key] = sql
+            values: List[Any] = [data[k] for k in GAME_UPDATE_COLUMNS if k in key]
             values.append(self.now())
-            fields.append("updated_at=?")
             values.append(data["id"])
-            sql = f"UPDATE games SET {', '.join(fields)} WHERE id=?"
             cur = self.db.exec(sql, tuple(values))
             self.db.commit()
             return {"updated": cur.rowcount}
         if action == "delete":
-            # 刪除遊戲及其相關資料
-            game_id = data["id"]
-            # 先刪除相關資料 (外鍵約束)
-            self.db.exec("DELETE FROM game_reviews WHERE game_id=?", (game_id,))
-            self.db.exec("DELETE FROM game_versions WHERE game_id=?", (game_id,))
-            self.db.exec("DELETE FROM rooms WHERE game_id=?", (game_id,))
-            # 最後刪除遊戲本身
-            cur = self.db.exec("DELETE FROM games WHERE id=?", (game_id,))
+            # 刪除遊戲，評論/版本/房間由 trg_games_delete 連帶刪除
+            cur = self.db.exec("DELETE FROM games WHERE id=?", (data["id"],))
             self.db.commit()
             return {"deleted": cur.rowcount}
         if action == "read":
             return self.fetch_one_dict("SELECT * FROM games WHERE id=?", (data["id"],))
+        if action == "check_owner":
+            # 權限檢查只需要 owner_id，不回傳整筆遊戲資料
+            row = self.fetch_one_dict("SELECT owner_id FROM games WHERE id=?", (data["id"],))
+            return {"exists": row is not None, "owned": row is not None and row["owner_id"] == data["ownerId"]}
         if action == "list_by_owner":
             return self.fetch_all_dicts(
                 "SELECT * FROM games WHERE owner_id=? ORDER BY created_at DESC",
@@ -581,20 +817,19 @@ class DBServer:
             )
         if action == "list_published":
             # JOIN game_versions 來獲取 latest_version_label
+            # 評分直接讀取 games 上的彙總欄位，不需掃描 game_reviews
+            page_sql, page_params = self.page_clause(data, "g.updated_at", "g.id")
             return self.fetch_all_dicts(
                 """
                 SELECT g.*, 
-                       IFNULL(avg(r.rating), 0) AS avg_rating, 
-                       COUNT(DISTINCT r.id) AS review_count,
+                       CASE WHEN g.rating_count > 0 THEN g.rating_sum * 1.0 / g.rating_count ELSE 0 END AS avg_rating, 
+                       g.rating_count AS review_count,
                        v.version_label AS latest_version_label
                 FROM games g
-                LEFT JOIN game_reviews r ON g.id = r.game_id
                 LEFT JOIN game_versions v ON g.latest_version_id = v.id
                 WHERE g.status='published'
-                GROUP BY g.id
-                ORDER BY g.updated_at DESC
-                """,
-                (),
+                """ + page_sql,
+                page_params,
             )
         raise ValueError("unsupported game action")
 
@@ -660,30 +895,74 @@ class DBServer:
                 "SELECT * FROM game_versions WHERE game_id=? ORDER BY created_at DESC",
                 (data["gameId"],),
             )
+        if action == "list_by_owner":
+            # 一次取得開發者所有遊戲的版本，由 SQLite 直接組出 {game_id: [版本...]} 的 JSON，
+            # 只需解析一次字串，不用逐列建立 dict 再分組
+            row = self.db.exec(
+                """
+                SELECT json_group_object(g.id, (
+                    SELECT json_group_array(json_object(
+                        'id', v.id, 'game_id', v.game_id, 'version_label', v.version_label,
+                        'changelog', v.changelog, 'package_path', v.package_path,
+                        'package_size', v.package_size, 'package_sha256', v.package_sha256,
+                        'client_entrypoint', v.client_entrypoint, 'server_entrypoint', v.server_entrypoint,
+                        'client_mode', v.client_mode, 'created_at', v.created_at))
+                    FROM (SELECT * FROM game_versions WHERE game_id=g.id ORDER BY created_at DESC) v
+                ))
+                FROM games g
+                WHERE g.owner_id=? AND EXISTS (SELECT 1 FROM game_versions WHERE game_id=g.id)
+                """,
+                (data["ownerId"],),
+            ).fetchone()
+            return decode_json(row[0].encode("utf-8"))
         raise ValueError("unsupported game version action")
 
     # Reviews
     def handle_gamereview(self, action: str, data: Dict[str, Any]) -> Any:
         if action == "upsert":
             now = self.now()
-            self.db.exec(
-                """
-                INSERT INTO game_reviews(game_id, player_id, rating, comment, created_at, updated_at)
-                VALUES(?,?,?,?,?,?)
-                ON CONFLICT(game_id, player_id) DO UPDATE SET
-                    rating=excluded.rating,
-                    comment=excluded.comment,
-                    updated_at=excluded.updated_at
-                """,
-                (
-                    data["gameId"],
-                    data["playerId"],
-                    data["rating"],
-                    data.get("comment", ""),
-                    now,
-                    now,
-                ),
-            )
+            # 先依舊評論 (若有) 調整遊戲的評分彙總，再寫入評論，兩者同一個交易提交；
+            # 任一語句失敗時復原，避免未寫入的評論留下彙總變更而隨下一個請求一起提交
+            try:
+                self.db.exec(
+                    """
+                    UPDATE games SET
+                        rating_sum = rating_sum + ? - IFNULL(
+                            (SELECT rating FROM game_reviews WHERE game_id=? AND player_id=?), 0),
+                        rating_count = rating_count + NOT EXISTS(
+                            SELECT 1 FROM game_reviews WHERE game_id=? AND player_id=?)
+                    WHERE id=?
+                    """,
+                    (
+                        data["rating"],
+                        data["gameId"],
+                        data["playerId"],
+                        data["gameId"],
+                        data["playerId"],
+                        data["gameId"],
+                    ),
+                )
+                self.db.exec(
+                    """
+                    INSERT INTO game_reviews(game_id, player_id, rating, comment, created_at, updated_at)
+                    VALUES(?,?,?,?,?,?)
+                    ON CONFLICT(game_id, player_id) DO UPDATE SET
+                        rating=excluded.rating,
+                        comment=excluded.comment,
+                        updated_at=excluded.updated_at
+                    """,
+                    (
+                        data["gameId"],
+                        data["playerId"],
+                        data["rating"],
+                        data.get("comment", ""),
+                        now,
+                        now,
+                    ),
+                )
+            except Exception:
+                self.db.conn.rollback()
+                raise
             self.db.commit()
             return {"ok": True}
         if action == "list_by_game":
@@ -697,6 +976,11 @@ class DBServer:
                 """,
                 (data["gameId"],),
             )
+        if action == "list_by_game_for_owner":
+            # 擁有權檢查與查詢評論合併為一次 RPC，非擁有者不回傳評論
+            owner = self.handle_game("check_owner", {"id": data["gameId"], "ownerId": data["ownerId"]})
+            owner["reviews"] = self.handle_gamereview("list_by_game", data) if owner["owned"] else []
+            return owner
         raise ValueError("unsupported review action")
 
     # Downloads
@@ -718,6 +1002,18 @@ class DBServer:
                 "SELECT * FROM player_downloads WHERE player_id=?",
                 (data["playerId"],),
             )
+        if action == "has_played_game":
+            # 玩家是否下載過該遊戲的任一版本 (評論資格)
+            row = self.db.exec(
+                """
+                SELECT 1 FROM player_downloads pd
+                JOIN game_versions gv ON pd.game_version_id = gv.id
+                WHERE pd.player_id=? AND gv.game_id=?
+                LIMIT 1
+                """,
+                (data["playerId"], data["gameId"]),
+            ).fetchone()
+            return {"played": row is not None}
         raise ValueError("unsupported download action")
 
     # Rooms
@@ -728,6 +1024,7 @@ class DBServer:
                 """
                 INSERT INTO rooms(code, owner_player_id, game_id, game_version_id, status, created_at, updated_at, capacity, metadata_json)
                 VALUES(?,?,?,?,?,?,?,?,?)
+                ON CONFLICT(code) DO NOTHING
                 """,
                 (
                     data["code"],
@@ -742,7 +1039,39 @@ class DBServer:
                 ),
             )
             self.db.commit()
-            return {"id": cur.lastrowid}
+            # 房間代碼重複時不寫入，回傳 id 為 None
+            return {"id": cur.lastrowid if cur.rowcount else None}
+        if action == "create_with_owner":
+            # 建立房間並加入房主，兩筆寫入在同一個交易中提交
+            now = self.now()
+            cur = self.db.exec(
+                """
+                INSERT INTO rooms(code, owner_player_id, game_id, game_version_id, status, created_at, updated_at, capacity, metadata_json)
+                VALUES(?,?,?,?,?,?,?,?,?)
+                ON CONFLICT(code) DO NOTHING
+                """,
+                (
+                    data["code"],
+                    data["ownerPlayerId"],
+                    data["gameId"],
+                    data["gameVersionId"],
+                    data.get("status", "waiting"),
+                    now,
+                    now,
+                    data.get("capacity", 4),
+                    data.get("metadataJson", "{}"),
+                ),
+            )
+            if cur.rowcount == 0:
+                # 房間代碼已被使用，由呼叫端換一個代碼重試
+                return {"id": None}
+            room_id = cur.lastrowid
+            self.db.exec(
+                "INSERT OR IGNORE INTO room_members(room_id, player_id, joined_at) VALUES(?,?,?)",
+                (room_id, data["ownerPlayerId"], now),
+            )
+            self.db.commit()
+            return {"id": room_id}
         if action == "update_status":
             cur = self.db.exec(
                 "UPDATE rooms SET status=?, updated_at=? WHERE id=?",
@@ -765,9 +1094,10 @@ class DBServer:
         if action == "read":
             return self.fetch_one_dict("SELECT * FROM rooms WHERE id=?", (data["id"],))
         if action == "list_open":
+            page_sql, page_params = self.page_clause(data, "updated_at", "id")
             return self.fetch_all_dicts(
-                "SELECT * FROM rooms WHERE status IN ('waiting','launching','playing') ORDER BY updated_at DESC",
-                (),
+                "SELECT * FROM rooms WHERE status IN ('waiting','launching','playing')" + page_sql,
+                page_params,
             )
         if action == "list_by_owner":
             return self.fetch_all_dicts(
@@ -803,6 +1133,35 @@ class DBServer:
                 """,
                 (data["roomId"],),
             )
+        if action == "is_member":
+            # 以主鍵 (room_id, player_id) 檢查，不需取出整個成員列表
+            row = self.db.exec(
+                "SELECT 1 FROM room_members WHERE room_id=? AND player_id=? LIMIT 1",
+                (data["roomId"], data["playerId"]),
+            ).fetchone()
+            return row is not None
+        if action == "count_for_room":
+            row = self.db.exec("SELECT COUNT(*) FROM room_members WHERE room_id=?", (data["roomId"],)).fetchone()
+            return row[0]
+        if action == "list_for_rooms":
+            # 一次取得多個房間的成員，依 room_id 分組
+            room_ids = list(data["roomIds"])
+            grouped: Dict[int, List[Dict[str, Any]]] = {room_id: [] for room_id in room_ids}
+            if not room_ids:
+                return grouped
+            rows = self.fetch_all_dicts(
+                f"""
+                SELECT rm.room_id, rm.player_id, rm.joined_at, p.display_name, p.username
+                FROM room_members rm
+                JOIN player_accounts p ON rm.player_id = p.id
+                WHERE rm.room_id IN ({",".join("?" * len(room_ids))})
+                ORDER BY rm.joined_at ASC
+                """,
+                tuple(room_ids),
+            )
+            for row in rows:
+                grouped[row["room_id"]].append(row)
+            return grouped
         if action == "clear_room":
             self.db.exec(
                 "DELETE FROM room_members WHERE room_id=?",
@@ -830,16 +1189,37 @@ class DBServer:
                 (data["playerId"],),
             )
         if action == "list_by_player":
-            # List all rooms the player is in
+            # List all rooms the player is in (most recently joined first)
+            page_sql, page_params = self.page_clause(data, "rm.joined_at", "rm.room_id", "beforeJoinedAt")
             return self.fetch_all_dicts(
                 """
                 SELECT rm.room_id, rm.joined_at, r.code, r.status
                 FROM room_members rm
                 JOIN rooms r ON rm.room_id = r.id
                 WHERE rm.player_id=? AND r.status IN ('waiting','launching','playing')
+                """ + page_sql,
+                (data["playerId"], *page_params),
+            )
+        if action == "list_by_players":
+            # 一次查詢多個玩家目前所在的房間 (各取最近加入的一間)，回傳 {player_id: 房間資訊}
+            player_ids = list(data["playerIds"])
+            if not player_ids:
+                return {}
+            rows = self.fetch_all_dicts(
+                f"""
+                SELECT rm.player_id, rm.room_id, rm.joined_at, r.code, r.status
+                FROM room_members rm
+                JOIN rooms r ON rm.room_id = r.id
+                WHERE rm.player_id IN ({",".join("?" * len(player_ids))})
+                  AND r.status IN ('waiting','launching','playing')
+                ORDER BY rm.joined_at DESC, rm.room_id DESC
                 """,
-                (data["playerId"],),
+                tuple(player_ids),
             )
+            current: Dict[int, Dict[str, Any]] = {}
+            for row in rows:
+                current.setdefault(row["player_id"], row)
+            return current
         raise ValueError("unsupported room member action")
 
     # Plugins
@@ -847,18 +1227,7 @@ class DBServer:
         if action == "upsert":
             now = self.now()
             self.db.exec(
-                """
-                INSERT INTO plugins(slug, name, description, latest_version, package_path, package_size, package_sha256, created_at, updated_at)
-                VALUES(?,?,?,?,?,?,?,?,?)
-                ON CONFLICT(slug) DO UPDATE SET
-                    name=excluded.name,
-                    description=excluded.description,
-                    latest_version=excluded.latest_version,
-                    package_path=excluded.package_path,
-                    package_size=excluded.package_size,
-                    package_sha256=excluded.package_sha256,
-                    updated_at=excluded.updated_at
-                """,
+                _PLUGIN_UPSERT_SQL,
                 (
                     data["slug"],
                     data["name"],
@@ -923,12 +1292,18 @@ class DBServer:
     # Invites
     def handle_invite(self, action: str, data: Dict[str, Any]) -> Any:
         if action == "create":
+            # 受邀玩家不存在時不寫入並回傳 {"id": None} (未開啟 PRAGMA foreign_keys，由 EXISTS 檢查)
             now = self.now()
             cur = self.db.exec(
-                "INSERT INTO invites(room_id, from_player_id, to_player_id, status, created_at) VALUES(?,?,?,?,?)",
-                (data["roomId"], data["fromPlayerId"], data["toPlayerId"], "pending", now),
+                """
+                INSERT INTO invites(room_id, from_player_id, to_player_id, status, created_at)
+                SELECT ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM player_accounts WHERE id=?)
+                """,
+                (data["roomId"], data["fromPlayerId"], data["toPlayerId"], "pending", now, data["toPlayerId"]),
             )
             self.db.commit()
+            if cur.rowcount == 0:
+                return {"id": None}
             return {"id": cur.lastrowid}
         if action == "read":
             return self.fetch_one_dict("SELECT * FROM invites WHERE id=?", (data["id"],))
@@ -953,6 +1328,81 @@ class DBServer:
             )
             self.db.commit()
             return {"ok": True}
+        if action == "accept_and_join":
+            # 接受邀請並加入房間，兩筆寫入在同一個交易中提交
+            self.db.exec("UPDATE invites SET status='accepted' WHERE id=?", (data["id"],))
+            self.db.exec(
+                "INSERT OR IGNORE INTO room_members(room_id, player_id, joined_at) VALUES(?,?,?)",
+                (data["roomId"], data["playerId"], self.now()),
+            )
+            self.db.commit()
+            return {"ok": True}
+        if action == "accept":
+            # 接受邀請: 驗證與寫入在同一次請求中完成，回傳 {"ok", "error"} 或 {"ok", "roomId"}
+            player_id = data["playerId"]
+            invite = self.fetch_one_dict("SELECT * FROM invites WHERE id=?", (data["id"],))
+            if not invite or invite["to_player_id"] != player_id or invite["status"] != "pending":
+                return {"ok": False, "error": "invalid invite"}
+            existing = self.db.exec(
+                """
+                SELECT r.code
+                FROM room_members rm
+                JOIN rooms r ON rm.room_id = r.id
+                WHERE rm.player_id=? AND r.status IN ('waiting','launching','playing')
+                LIMIT 1
+                """,
+                (player_id,),
+            ).fetchone()
+            if existing:
+                return {"ok": False, "error": f"You are already in room {existing['code']}. Leave it first."}
+            room_id = invite["room_id"]
+            room = self.db.exec("SELECT status FROM rooms WHERE id=?", (room_id,)).fetchone()
+            if not room:
+                self.db.exec("DELETE FROM invites WHERE room_id=?", (room_id,))
+                self.db.commit()
+                return {"ok": False, "error": "room not found"}
+            if room["status"] != "waiting":
+                return {"ok": False, "error": "room not waiting"}
+            # 人數、房間狀態與邀請狀態的條件寫在 INSERT 內，與其他連線的加入/接受不會互相超賣；
+            # 玩家已是成員時由主鍵擋下 (不使用 OR IGNORE，以免被誤判為其他原因)
+            try:
+                cur = self.db.exec(
+                    """
+                    INSERT INTO room_members(room_id, player_id, joined_at)
+                    SELECT ?, ?, ?
+                    WHERE (SELECT COUNT(*) FROM room_members WHERE room_id=?)
+                          < (SELECT capacity FROM rooms WHERE id=? AND status='waiting')
+                      AND EXISTS (SELECT 1 FROM invites WHERE id=? AND status='pending')
+                    """,
+                    (room_id, player_id, self.now(), room_id, room_id, data["id"]),
+                )
+                inserted = cur.rowcount > 0
+            except sqlite3.IntegrityError:
+                inserted = False
+            if not inserted:
+                # 沒有寫入時重新讀取，依序區分已是成員、邀請已被處理、房間狀態改變與人數已滿
+                # (其他請求可能在上面的檢查之後搶先完成)
+                member = self.db.exec(
+                    """
+                    SELECT r.code FROM room_members rm JOIN rooms r ON rm.room_id = r.id
+                    WHERE rm.room_id=? AND rm.player_id=?
+                    """,
+                    (room_id, player_id),
+                ).fetchone()
+                if member:
+                    return {"ok": False, "error": f"You are already in room {member['code']}. Leave it first."}
+                invite = self.fetch_one_dict("SELECT status FROM invites WHERE id=?", (data["id"],))
+                if not invite or invite["status"] != "pending":
+                    return {"ok": False, "error": "invalid invite"}
+                room = self.db.exec("SELECT status FROM rooms WHERE id=?", (room_id,)).fetchone()
+                if not room:
+                    return {"ok": False, "error": "room not found"}
+                if room["status"] != "waiting":
+                    return {"ok": False, "error": "room not waiting"}
+                return {"ok": False, "error": "room full"}
+            self.db.exec("UPDATE invites SET status='accepted' WHERE id=?", (data["id"],))
+            self.db.commit()
+            return {"ok": True, "roomId": room_id}
         if action == "delete_by_room":
             self.db.exec("DELETE FROM invites WHERE room_id=?", (data["roomId"],))
             self.db.commit()
@@ -976,6 +1426,17 @@ class DBServer:
             )
             self.db.commit()
             return {"id": cur.lastrowid}
+        if action == "bulk_create":
+            # 批次寫入 [room_id, player_id, message, created_at]，已刪除房間的訊息直接略過
+            cur = self.db.executemany(
+                """
+                INSERT INTO room_chat(room_id, player_id, message, created_at)
+                SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM rooms WHERE id=?)
+                """,
+                [(room_id, player_id, message, created_at, room_id) for room_id, player_id, message, created_at in data["rows"]],
+            )
+            self.db.commit()
+            return {"inserted": cur.rowcount}
         if action == "list":
             limit = data.get("limit", 50)
             return self.fetch_all_dicts(
@@ -1003,6 +1464,7 @@ def main() -> None:
     parser.add_argument("--db", default="store.sqlite3")
     args = parser.parse_args()
 
+    setup_logging()
     db_path = Path(args.db)
     server = DBServer(args.host, args.port, db_path)
     server.serve()
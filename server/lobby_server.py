@@ -15,6 +15,7 @@
 
 架構說明:
 - 通過 DBClient 與 DB Server 溝通
+- 以 asyncio event loop 處理所有連線的讀寫，完整的請求交由 worker thread 執行
 - 維護玄家 Session 與活躍房間資訊
 - 負責遊戲 Server 的啟動與管理
 
@@ -27,28 +28,81 @@
 6. 遊戲結束後，Lobby Server 自動清理資源
 """
 import argparse
+import asyncio
 import base64
-import hashlib
-import json
+import collections
 import os
+import queue
 import random
+import secrets
+import shlex
 import shutil
 import socket
 import string
+import struct
 import subprocess
 import threading
 import time
 import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from common.lp import find_free_port, recv_json, send_json
+from common.lp import MAX_FRAME, decode_json, encode_json, find_free_port, recv_frame_async, recv_json, send_frame, send_json
 
 # ============================================================
 # 常數定義
 # ============================================================
 # 房間代碼使用的字元集 (A-Z, 0-9)
 CODE_ALPHABET = string.ascii_uppercase + string.digits
+# 房間代碼長度
+ROOM_CODE_LENGTH = 6
+# 房間代碼重複時的最大嘗試次數 (36^6 種代碼，幾乎不會重複)
+ROOM_CODE_ATTEMPTS = 5
+# 列表請求可轉送給 DB Server 的分頁欄位
+PAGE_KEYS = ("limit", "beforeUpdatedAt", "beforeId")
+# 執行請求 handler 的 worker thread 數 (閒置連線不佔用 worker)
+LOBBY_WORKERS = 32
+# handler 內同時送出互不相依 DB 查詢的 thread 數 (見 db_parallel)
+DB_PARALLEL_WORKERS = 16
+# 同時準備 Runtime 並啟動 Game Server 的 thread 數
+LAUNCH_WORKERS = 4
+# 解壓遊戲套件時每次複製的區塊大小 (1MB)
+EXTRACT_BUFFER = 1024 * 1024
+# 更新 DB 中登入 Session last_seen_at 的間隔 (秒)，須明顯小於 DB Server 的 SESSION_TTL
+SESSION_HEARTBEAT_INTERVAL = 30
+# 聊天訊息暫存後批次寫入 DB: 最長間隔 (秒) 與累積多少筆時提前寫入
+CHAT_FLUSH_INTERVAL = 0.2
+CHAT_FLUSH_BATCH = 128
+# 暫存聊天訊息的上限: DB 無法寫入而累積到此數量時，新訊息改為同步寫入，仍失敗則回覆錯誤
+CHAT_QUEUE_LIMIT = 4096
+# 聊天記錄每次回傳的筆數 (預設 / 上限)；limit 同時是快取的 key，需限制範圍
+CHAT_HISTORY_LIMIT = 50
+CHAT_HISTORY_MAX_LIMIT = 200
+# 聊天記錄回應快取的房間數上限 (最久未使用的房間先移除)
+CHAT_HISTORY_CACHE_ROOMS = 512
+# DB Server 連線池保留的閒置連線數: 與會呼叫 db.call 的 worker 總數相同，
+# 滿載時每個 worker 都能拿到既有連線，不會在用完後被關閉又重新連線
+DB_POOL_SIZE = LOBBY_WORKERS + DB_PARALLEL_WORKERS + LAUNCH_WORKERS
+# 遊戲/版本等很少變動的查詢結果快取時間 (秒) 與筆數上限
+CACHE_TTL = 5.0
+CACHE_MAX_ENTRIES = 1024
+# 遊戲執行時的暫存目錄 (模組載入時解析一次)
+RUNTIME_ROOT = Path(__file__).resolve().parent / "runtime"
+
+# 預先編碼的固定回應，以 send_frame 直接送出
+OK_RESPONSE = encode_json({"ok": True})
+# 不帶參數的 PING 請求 (緊湊與標準 json.dumps 兩種編碼)，在 event loop 中直接回應
+PING_REQUESTS = frozenset({b'{"type":"PING"}', b'{"type": "PING"}'})
+ERR_ALREADY_LOGGED_IN = encode_json({"ok": False, "error": "This account is already logged in from another session"})
+ERR_NOT_AUTHENTICATED = encode_json({"ok": False, "error": "not authenticated"})
+ERR_UNKNOWN_ACTION = encode_json({"ok": False, "error": "unknown action"})
+ERR_MISSING_ROOM_ID = encode_json({"ok": False, "error": "missing roomId"})
+ERR_INVALID_ROOM_ID = encode_json({"ok": False, "error": "invalid roomId"})
+ERR_ROOM_NOT_FOUND = encode_json({"ok": False, "error": "room not found"})
+ERR_NOT_IN_ROOM = encode_json({"ok": False, "error": "not in room"})
+ERR_NOT_IN_THIS_ROOM = encode_json({"ok": False, "error": "you are not in this room"})
+ERR_CHAT_UNAVAILABLE = encode_json({"ok": False, "error": "chat temporarily unavailable"})
 
 
 # ============================================================
@@ -59,26 +113,121 @@ class DBClient:
     DB Server 客戶端
     
     封裝與 DB Server 的通訊，提供簡單的 call() 方法
-    每次呼叫都建立新的 TCP 連線 (簡化設計)
+    連線會保留在連線池中重複使用 (DB Server 支援同一連線多次請求)，
+    每個呼叫取出一條閒置連線獨佔使用，多個 handler thread 可同時查詢
     
     使用範例:
         db = DBClient("127.0.0.1", 23000)
         result = db.call("Game", "list_published", {})
     """
     
-    def __init__(self, host: str, port: int) -> None:
+    def __init__(self, host: str, port: int, pool_size: int = DB_POOL_SIZE) -> None:
         self.host = host
         self.port = port
+        self.pool: "queue.LifoQueue[socket.socket]" = queue.LifoQueue(maxsize=pool_size)
+
+    def connect(self) -> socket.socket:
+        """建立新的 DB Server 連線"""
+        s = socket.create_connection((self.host, self.port))
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # 閒置在連線池中的連線若已失效，可由 keepalive 偵測
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        return s
+
+    def release(self, s: socket.socket) -> None:
+        """將連線放回連線池，池已滿則關閉"""
+        try:
+            self.pool.put_nowait(s)
+        except queue.Full:
+            s.close()
 
     def call(self, entity: str, action: str, data: Dict) -> Dict:
         """向 DB Server 發送請求"""
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.connect((self.host, self.port))
-            send_json(s, {"entity": entity, "action": action, "data": data})
+        request = {"entity": entity, "action": action, "data": data}
+        try:
+            s = self.pool.get_nowait()
+            reused = True
+        except queue.Empty:
+            s = self.connect()
+            reused = False
+        try:
+            send_json(s, request)
             resp = recv_json(s)
-            if not resp.get("ok"):
-                raise RuntimeError(resp.get("error", "資料庫錯誤"))
-            return resp["result"]
+        except (ConnectionError, OSError):
+            s.close()
+            if not reused:
+                raise
+            # 池中的連線可能已被 DB Server 關閉 (例如重新啟動)，改用新連線重試一次
+            s = self.connect()
+            try:
+                send_json(s, request)
+                resp = recv_json(s)
+            except Exception:
+                s.close()
+                raise
+        except Exception:
+            s.close()
+            raise
+        self.release(s)
+        if not resp.get("ok"):
+            raise RuntimeError(resp.get("error", "資料庫錯誤"))
+        return resp["result"]
+
+    def batch(self, calls: List[Tuple[str, str, Dict]]) -> List[Any]:
+        """
+        以一次往返執行多個 (entity, action, data) 查詢，回傳結果的順序與參數相同
+
+        由 DB Server 依序執行，任一查詢失敗時拋出 RuntimeError
+        """
+        return self.call(
+            "DB", "batch", {"calls": [{"entity": e, "action": a, "data": d} for e, a, d in calls]}
+        )
+
+
+# ============================================================
+# 玩家連線
+# ============================================================
+class LobbyConnection:
+    """
+    玩家連線 (由 asyncio event loop 負責讀寫)
+
+    handler 在 worker thread 中執行，透過 send_json/send_frame(conn, ...) 寫入的回應
+    先暫存在 outbox，handler 結束後由 event loop 一次送出
+    同時作為 sessions 的 key，代表一條玩家連線
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        # 待送出的回應: 已編碼的 bytes，或 (檔案路徑, 大小) 表示以二進位 frame 串流送出的檔案
+        self.outbox: List[Any] = []
+
+    def send(self, data: bytes) -> int:
+        """供 send_json/send_frame 呼叫，將回應加入 outbox"""
+        self.outbox.append(bytes(data))
+        return len(data)
+
+    def send_file(self, path: Path, size: int) -> None:
+        """將檔案內容排入 outbox，flush 時以一個二進位 frame 送出 (不讀入記憶體)"""
+        self.outbox.append((path, size))
+
+    async def flush(self) -> None:
+        """送出 outbox 中的回應並等待寫入緩衝區消化"""
+        pending: List[bytes] = []
+        for item in self.outbox:
+            if isinstance(item, tuple):
+                path, size = item
+                self.writer.write(b"".join(pending) + struct.pack("!I", size))
+                pending.clear()
+                # loop.sendfile 在支援的平台使用 os.sendfile，檔案內容直接由 kernel 送出，
+                # 不經過 user space；不支援時自動退回分段讀取/寫入
+                with open(path, "rb") as fp:
+                    await asyncio.get_running_loop().sendfile(self.writer.transport, fp, 0, size)
+            else:
+                pending.append(item)
+        self.outbox.clear()
+        if pending:
+            self.writer.write(b"".join(pending))
+        await self.writer.drain()
 
 
 # ============================================================
@@ -92,14 +241,16 @@ class PlayerSession:
     - account: 玩家帳號資訊 (從 DB 取得)
     - token: 唯一的 Session 識別碼
     - logged_in_at: 登入時間
+    - current_room_id: 最近確認過玩家所在的房間 (見 LobbyServer.in_room)
     
     用於避免重複登入與追蹤線上玩家
     """
     
     def __init__(self, account: Dict[str, any]) -> None:
         self.account = account
-        self.token = f"ps_{account['id']}_{int(time.time())}"
+        self.token = secrets.token_hex(16)
         self.logged_in_at = int(time.time())
+        self.current_room_id: Optional[int] = None
 
 
 # ============================================================
@@ -125,45 +276,141 @@ class LobbyServer:
         self.host = host
         self.port = port
         self.public_host = public_host or host  # 用於告知客戶端連線的位址
+        # 登入 Session 記錄在 DB 中時標示持有的 Lobby Server
+        self.server_id = f"{self.public_host}:{port}"
         self.db = DBClient(db_host, db_port)
-        self.sessions: Dict[socket.socket, Optional[PlayerSession]] = {}
+        self.sessions: Dict[LobbyConnection, Optional[PlayerSession]] = {}
+        self.sessions_by_player: Dict[int, PlayerSession] = {}  # account_id -> 登入中的 Session
         self.active_rooms: Dict[int, Dict[str, any]] = {}  # 追蹤活躍房間
-        self.lock = threading.Lock()
-        self.runtime_root = Path(__file__).resolve().parent / "runtime"
+        # sessions 與 active_rooms 各自使用一把鎖，互不阻塞
+        self.sessions_lock = threading.Lock()
+        self.rooms_lock = threading.Lock()
+        # 完整的請求才交給 worker 執行 handler (內含阻塞的 DB 呼叫)
+        self.pool = ThreadPoolExecutor(max_workers=LOBBY_WORKERS, thread_name_prefix="lobby")
+        # handler 本身在 self.pool 中執行，平行查詢使用另一個 pool 以免互相等待而卡死
+        self.db_pool = ThreadPoolExecutor(max_workers=DB_PARALLEL_WORKERS, thread_name_prefix="lobby-db")
+        # 房間清理時在背景終止遊戲程序
+        self._cleanup_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lobby-cleanup")
+        # 遊戲啟動 (解壓縮 Runtime + Popen) 在獨立的 pool 執行，同時啟動的數量有上限
+        self._launch_pool = ThreadPoolExecutor(max_workers=LAUNCH_WORKERS, thread_name_prefix="lobby-launch")
+        # 遊戲結束後的 Runtime 資料夾交給單一背景 thread 刪除，不延遲房間狀態更新
+        self._reaper_q: "queue.Queue[Path]" = queue.Queue()
+        threading.Thread(target=self._reaper_loop, name="lobby-reaper", daemon=True).start()
+        # (entity, action, 編碼後的參數) -> (查詢時間, 結果)，見 db_cached
+        self._cache: Dict[Tuple[str, str, bytes], Tuple[float, Any]] = {}
+        self._cache_lock = threading.Lock()
+        # Plugin 套件路徑 -> ((修改時間, 大小), base64 內容)，見 plugin_package
+        self._plugin_packages: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        # 待寫入的聊天訊息 [room_id, player_id, message, created_at]，由背景 thread 批次寫入；
+        # 寫入失敗的訊息會放回佇列前端重試，數量以 CHAT_QUEUE_LIMIT 限制
+        self._chat_queue: "collections.deque[List[Any]]" = collections.deque()
+        self._chat_cv = threading.Condition()
+        self._chat_flush_lock = threading.Lock()  # 確保各批次依序寫入
+        # 聊天記錄回應快取 room_id -> {limit: (查詢時間, 編碼後的回應)}，依最近使用排序；
+        # _chat_versions 在房間有新訊息時遞增，查詢期間有新訊息則不寫入快取 (皆以 _chat_cv 保護)
+        self._chat_history: "collections.OrderedDict[int, Dict[int, Tuple[float, bytes]]]" = collections.OrderedDict()
+        self._chat_versions: Dict[int, int] = {}
+        threading.Thread(target=self._chat_flush_loop, name="lobby-chat", daemon=True).start()
+        threading.Thread(target=self._session_heartbeat_loop, name="lobby-heartbeat", daemon=True).start()
+        self.runtime_root = RUNTIME_ROOT
         self.runtime_root.mkdir(parents=True, exist_ok=True)
+        # Game Server 的環境變數: 啟動時複製一次，每次啟動只需加上房間相關的變數
+        self._base_env: Dict[str, str] = {
+            **os.environ,
+            "GAME_SERVER_HOST": self.host,
+            "LOBBY_HOST": self.host,
+            "LOBBY_PORT": str(self.port),
+        }
+        # 請求類型 -> handler，不需要登入的操作為 handler(conn, req)
+        self.public_handlers: Dict[str, Callable[[LobbyConnection, Dict], None]] = {
+            "PING": self.handle_ping,
+            "REGISTER": self.handle_register,
+            "LOGIN": self.handle_login,
+        }
+        # 需要登入的操作為 handler(conn, session, req)
+        self.handlers: Dict[str, Callable[[LobbyConnection, PlayerSession, Dict], Optional[Future]]] = {
+            "LIST_GAMES": self.handle_list_games,                 # Use Case P1
+            "GET_GAME_DETAILS": self.handle_get_game_details,
+            "DOWNLOAD_GAME": self.handle_download,                # Use Case P2
+            "LIST_ROOMS": self.handle_list_rooms,                 # Use Case P3
+            "CREATE_ROOM": self.handle_create_room,
+            "JOIN_ROOM": self.handle_join_room,
+            "LEAVE_ROOM": self.handle_leave_room,
+            "GET_ROOM_DETAILS": self.handle_get_room_details,
+            "START_GAME": self.handle_start_game,
+            "GET_GAME": self.handle_get_game,
+            "SUBMIT_REVIEW": self.handle_submit_review,           # Use Case P4
+            "LIST_ACTIVE_PLAYERS": self.handle_list_active_players,
+            "LOGOUT": self.handle_logout,
+            "INVITE": self.handle_invite,
+            "LIST_INVITES": self.handle_list_invites,
+            "ACCEPT_INVITE": self.handle_accept_invite,
+            "PLUGIN_LIST": self.handle_plugin_list,               # Use Case PL1-PL4
+            "PLUGIN_INSTALL": self.handle_plugin_install,
+            "PLUGIN_REMOVE": self.handle_plugin_remove,
+            "ROOM_CHAT": self.handle_room_chat,                   # Plugin 功能: 房間聊天 (Use Case PL3)
+            "GET_ROOM_CHAT_HISTORY": self.handle_get_room_chat_history,
+        }
+
+    # ============================================================
+    # 查詢快取
+    # ============================================================
+    def db_cached(self, entity: str, action: str, data: Dict, ttl: float = CACHE_TTL) -> Any:
+        """
+        唯讀查詢用的 db.call，ttl 秒內相同的查詢直接使用快取結果
+
+        只用於顯示用途或不會變動的資料 (例如版本)；需要即時狀態的檢查
+        (例如下載/建立房間前確認遊戲仍為 published) 仍直接呼叫 self.db.call
+        """
+        key = (entity, action, encode_json(data))
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached and now - cached[0] < ttl:
+            return cached[1]
+        result = self.db.call(entity, action, data)
+        with self._cache_lock:
+            if len(self._cache) >= CACHE_MAX_ENTRIES:
+                self._cache.clear()
+            self._cache[key] = (now, result)
+        return result
+
+    def db_parallel(self, *calls: Tuple[Any, ...]) -> List[Any]:
+        """
+        同時執行數個互不相依的查詢，等待時間為最慢的一個而非全部相加
+
+        每個參數為 (函數, 參數...)，例如 (self.db.call, "Room", "read", {"id": 1})；
+        回傳結果的順序與參數相同，任一查詢失敗時拋出該例外
+        """
+        futures = [self.db_pool.submit(fn, *args) for fn, *args in calls]
+        return [future.result() for future in futures]
+
+    def invalidate_cache(self, entity: str, action: str) -> None:
+        """資料變更後移除該查詢的所有快取"""
+        with self._cache_lock:
+            for key in [k for k in self._cache if k[0] == entity and k[1] == action]:
+                del self._cache[key]
 
     # ============================================================
     # 房間清理相關方法
     # ============================================================
     def cleanup_room(self, room_id: int) -> None:
         """清理房間：刪除邀請、成員、房間本身"""
-        with self.lock:
+        with self.rooms_lock:
             active = self.active_rooms.pop(room_id, None)
         if active:
-            # 終止遊戲 Server Process
-            process = active.get("process")
-            if process:
-                try:
-                    process.terminate()
-                    process.wait(timeout=5)
-                except Exception:
-                    pass
-            # 清理 Runtime 資料夾
-            runtime = active.get("runtime")
-            if runtime:
-                try:
-                    shutil.rmtree(runtime, ignore_errors=True)
-                except Exception:
-                    pass
-        # 清理資料庫記錄
-        try:
-            self.db.call("Invite", "delete_by_room", {"roomId": room_id})
-        except Exception:
-            pass
-        try:
-            self.db.call("RoomMember", "clear_room", {"roomId": room_id})
-        except Exception:
-            pass
+            # 在背景終止遊戲 Server Process，呼叫端不必等待程序結束；程序結束後刪除 Runtime 資料夾
+            # (monitor_room_process 若在此之前已找不到房間就不會刪除，因此這裡也要排入)
+            self._cleanup_pool.submit(self.stop_room_process, active.get("process"), active.get("runtime"))
+        with self._chat_cv:
+            self._chat_history.pop(room_id, None)
+            self._chat_versions.pop(room_id, None)
+        # 房間內玩家的 current_room_id 快取隨房間失效
+        with self.sessions_lock:
+            for player_session in self.sessions_by_player.values():
+                if player_session.current_room_id == room_id:
+                    player_session.current_room_id = None
+        # 清理資料庫記錄 (邀請、成員、聊天由 DB 端 trigger 隨房間一併刪除)
         try:
             deleted = self.db.call("Room", "delete", {"id": room_id})
             if not deleted.get("deleted"):
@@ -171,6 +418,80 @@ class LobbyServer:
         except Exception:
             pass
 
+    def _reaper_loop(self) -> None:
+        """依序刪除排入 _reaper_q 的 Runtime 資料夾"""
+        while True:
+            runtime = self._reaper_q.get()
+            shutil.rmtree(runtime, ignore_errors=True)
+
+    def _session_heartbeat_loop(self) -> None:
+        """
+        每 SESSION_HEARTBEAT_INTERVAL 秒更新本 Server 登入中玩家的 Session
+
+        已離線 (或釋放失敗) 的 Session 不再更新，超過 SESSION_TTL 後即可重新登入
+        """
+        while True:
+            time.sleep(SESSION_HEARTBEAT_INTERVAL)
+            with self.sessions_lock:
+                rows = [[player_id, sess.token] for player_id, sess in self.sessions_by_player.items()]
+            if not rows:
+                continue
+            try:
+                self.db.call("PlayerAccount", "touch_sessions", {"sessions": rows})
+            except Exception as exc:
+                print(f"[Lobby] touch_sessions failed: {exc}")
+
+    def _chat_flush_loop(self) -> None:
+        """每 CHAT_FLUSH_INTERVAL 秒 (或累積 CHAT_FLUSH_BATCH 筆時) 寫入暫存的聊天訊息"""
+        while True:
+            with self._chat_cv:
+                self._chat_cv.wait_for(lambda: len(self._chat_queue) >= CHAT_FLUSH_BATCH, timeout=CHAT_FLUSH_INTERVAL)
+            if not self.flush_chat():
+                # DB 暫時無法寫入: 等待一個間隔再重試，避免佇列已滿時不停重送
+                time.sleep(CHAT_FLUSH_INTERVAL)
+
+    def flush_chat(self) -> bool:
+        """
+        將暫存的聊天訊息以 RoomChat.bulk_create 寫入 DB (每次最多 CHAT_FLUSH_BATCH 筆)
+
+        寫入失敗時該批訊息放回佇列前端，於下次 flush 依原順序重試
+
+        Returns:
+            bool: 佇列是否已全部寫入
+        """
+        with self._chat_flush_lock:
+            while True:
+                with self._chat_cv:
+                    if not self._chat_queue:
+                        return True
+                    count = min(len(self._chat_queue), CHAT_FLUSH_BATCH)
+                    rows = [self._chat_queue.popleft() for _ in range(count)]
+                try:
+                    self.db.call("RoomChat", "bulk_create", {"rows": rows})
+                except Exception as exc:
+                    with self._chat_cv:
+                        self._chat_queue.extendleft(reversed(rows))
+                        pending = len(self._chat_queue)
+                    print(f"[Lobby] flush_chat failed, {pending} message(s) pending retry: {exc}")
+                    return False
+
+    def stop_room_process(self, process: Optional[subprocess.Popen], runtime: Optional[Path]) -> None:
+        """終止房間的遊戲程序並排入刪除 Runtime 資料夾 (與 monitor_room_process 重複排入無妨)"""
+        if process:
+            self.stop_process(process)
+        if runtime:
+            self._reaper_q.put(runtime)
+
+    def stop_process(self, process: subprocess.Popen) -> None:
+        """終止遊戲 Server Process，5 秒內未結束則強制結束"""
+        try:
+            process.terminate()
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        except Exception:
+            pass
+
     def cleanup_user(self, player_id: int) -> None:
         """清理玩家相關資源 (離線時呼叫)"""
         # 清理玩家擁有的房間
@@ -190,114 +511,142 @@ class LobbyServer:
             print(f"[Lobby] cleanup_user invites failed: {e}")
 
     def serve(self) -> None:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            s.bind((self.host, self.port))
-            s.listen()
-            print(f"[Lobby] listening on {self.host}:{self.port}")
-            while True:
-                conn, addr = s.accept()
-                threading.Thread(target=self.handle_client, args=(conn, addr), daemon=True).start()
+        try:
+            asyncio.run(self.serve_async())
+        finally:
+            # 關閉前寫入尚未送出的聊天訊息
+            self.flush_chat()
+
+    async def serve_async(self) -> None:
+        """
+        以單一 event loop 接受並讀取所有玩家連線
 
-    def handle_client(self, conn: socket.socket, addr: Tuple[str, int]) -> None:
+        event loop 以 selectors.DefaultSelector (Linux 為 epoll) 同時監看所有連線，
+        閒置的玩家連線只佔用一個 coroutine，不再各自佔用一個 thread；
+        收到完整請求後才交給 self.pool 的 worker thread 執行
+        """
+        try:
+            # 上次執行未正常結束時，DB 中仍留有本 Server 的登入 Session，需先清除
+            # DB 呼叫是阻塞的，交給 thread 執行，event loop 本身不做任何阻塞 I/O
+            released = await asyncio.to_thread(
+                self.db.call, "PlayerAccount", "release_server_sessions", {"serverId": self.server_id}
+            )
+            if released.get("released"):
+                print(f"[Lobby] released {released['released']} stale session(s)")
+        except Exception as exc:
+            print(f"[Lobby] release_server_sessions failed: {exc}")
+        # 在背景預先編碼所有 Plugin 套件，第一次 PLUGIN_INSTALL 也不必等待編碼
+        self._cleanup_pool.submit(self.warm_plugin_packages)
+        server = await asyncio.start_server(self.handle_client, self.host, self.port, reuse_address=True)
+        print(f"[Lobby] listening on {self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        addr = writer.get_extra_info("peername")
         print(f"[Lobby] Client connected: {addr}")
-        with self.lock:
+        loop = asyncio.get_running_loop()
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            # 請求/回應都是小封包，關閉 Nagle 避免與 delayed ACK 疊加造成延遲；
+            # keepalive 讓斷線但未送出 FIN 的玩家連線最終會被偵測並清理
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        conn = LobbyConnection(writer)
+        with self.sessions_lock:
             self.sessions[conn] = None
         try:
             while True:
-                req = recv_json(conn)
-                action = req.get("type")
-                if action == "PING":
-                    send_json(conn, {"ok": True})
-                    continue
-                if action == "REGISTER":
-                    self.handle_register(conn, req)
-                    continue
-                if action == "LOGIN":
-                    self.handle_login(conn, req)
-                    continue
-                session = self.sessions.get(conn)
-                if not session:
-                    send_json(conn, {"ok": False, "error": "not authenticated"})
-                    continue
-                if action == "LIST_GAMES":
-                    games = self.db.call("Game", "list_published", {})
-                    send_json(conn, {"ok": True, "games": games})
-                elif action == "GET_GAME_DETAILS":
-                    game_id = req["gameId"]
-                    game = self.db.call("Game", "read", {"id": game_id})
-                    if not game:
-                        send_json(conn, {"ok": False, "error": "Game not found"})
-                        continue
-                    # Get developer/author info
-                    developer = None
-                    if game.get("owner_id"):
-                        try:
-                            developer = self.db.call("DeveloperAccount", "read", {"id": game["owner_id"]})
-                        except Exception:
-                            pass
-                    versions = self.db.call("GameVersion", "list_by_game", {"gameId": game_id})
-                    reviews = self.db.call("GameReview", "list_by_game", {"gameId": game_id})
-                    send_json(conn, {"ok": True, "game": game, "developer": developer, "versions": versions, "reviews": reviews})
-                elif action == "DOWNLOAD_GAME":
-                    self.handle_download(conn, session, req)
-                elif action == "LIST_ROOMS":
-                    self.handle_list_rooms(conn)
-                elif action == "CREATE_ROOM":
-                    self.handle_create_room(conn, session, req)
-                elif action == "JOIN_ROOM":
-                    self.handle_join_room(conn, session, req)
-                elif action == "LEAVE_ROOM":
-                    self.handle_leave_room(conn, session, req)
-                elif action == "GET_ROOM_DETAILS":
-                    self.handle_get_room_details(conn, session, req)
-                elif action == "START_GAME":
-                    self.handle_start_game(conn, session, req)
-                elif action == "GET_GAME":
-                    self.handle_get_game(conn, session, req)
-                elif action == "SUBMIT_REVIEW":
-                    self.handle_submit_review(conn, session, req)
-                elif action == "LIST_ACTIVE_PLAYERS":
-                    self.handle_list_active_players(conn)
-                elif action == "LOGOUT":
-                    self.handle_logout(conn, session)
-                elif action == "INVITE":
-                    self.handle_invite(conn, session, req)
-                elif action == "LIST_INVITES":
-                    self.handle_list_invites(conn, session)
-                elif action == "ACCEPT_INVITE":
-                    self.handle_accept_invite(conn, session, req)
-                elif action == "PLUGIN_LIST":
-                    plugins = self.db.call("Plugin", "list", {})
-                    installed = self.db.call(
-                        "PlayerPlugin", "list_by_player", {"playerId": session.account["id"]}
-                    )
-                    send_json(conn, {"ok": True, "plugins": plugins, "installed": installed})
-                elif action == "PLUGIN_INSTALL":
-                    self.handle_plugin_install(conn, session, req)
-                elif action == "PLUGIN_REMOVE":
-                    self.handle_plugin_remove(conn, session, req)
-                elif action == "ROOM_CHAT":
-                    # Plugin 功能: 房間聊天 (Use Case PL3)
-                    self.handle_room_chat(conn, session, req)
-                elif action == "GET_ROOM_CHAT_HISTORY":
-                    # Plugin 功能: 取得聊天記錄
-                    self.handle_get_room_chat_history(conn, session, req)
+                body = await recv_frame_async(reader)
+                if body in PING_REQUESTS:
+                    # keepalive 不需解碼 JSON，也不必交給 worker thread
+                    send_frame(conn, OK_RESPONSE)
                 else:
-                    send_json(conn, {"ok": False, "error": "unknown action"})
+                    pending = await loop.run_in_executor(self.pool, self.dispatch, conn, decode_json(body))
+                    if pending is not None:
+                        # handler 把工作交給其他 pool (例如 START_GAME)，等它寫入回應後再送出
+                        await asyncio.wrap_future(pending)
+                await conn.flush()
+        except asyncio.IncompleteReadError:
+            pass
         except Exception as exc:
             print(f"[Lobby] Client {addr} error: {exc}")
         finally:
-            with self.lock:
+            with self.sessions_lock:
                 session = self.sessions.pop(conn, None)
                 if session:
-                    print(f"[Lobby] Player '{session.account['username']}' disconnected")
-                    self.cleanup_user(session.account["id"])
-                else:
-                    print(f"[Lobby] Client {addr} disconnected (not logged in)")
-            conn.close()
+                    self.sessions_by_player.pop(session.account["id"], None)
+            if session:
+                print(f"[Lobby] Player '{session.account['username']}' disconnected")
+                try:
+                    await loop.run_in_executor(self.pool, self.release_session, session)
+                    await loop.run_in_executor(self.pool, self.cleanup_user, session.account["id"])
+                except Exception as exc:
+                    print(f"[Lobby] cleanup_user failed: {exc}")
+            else:
+                print(f"[Lobby] Client {addr} disconnected (not logged in)")
+            writer.close()
+
+    def dispatch(self, conn: LobbyConnection, req: Dict[str, any]) -> Optional[Future]:
+        """
+        依請求類型呼叫對應的 handler (在 worker thread 中執行)
+
+        handler 可回傳 Future 表示回應稍後才會寫入，由 handle_client 等待完成後再送出
+        """
+        action = req.get("type")
+        handler = self.public_handlers.get(action)
+        if handler is not None:
+            handler(conn, req)
+            return
+        session = self.sessions.get(conn)
+        if not session:
+            send_frame(conn, ERR_NOT_AUTHENTICATED)
+            return
+        handler = self.handlers.get(action)
+        if handler is None:
+            send_frame(conn, ERR_UNKNOWN_ACTION)
+            return
+        return handler(conn, session, req)
+
+    def handle_ping(self, conn: LobbyConnection, req: Dict[str, any]) -> None:
+        send_frame(conn, OK_RESPONSE)
+
+    def handle_list_games(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
+        page = {k: req[k] for k in PAGE_KEYS if k in req}
+        games = self.db_cached("Game", "list_published", page)
+        send_json(conn, {"ok": True, "games": games})
+
+    def handle_get_game_details(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
+        game_id = req["gameId"]
+        game = self.db_cached("Game", "read", {"id": game_id})
+        if not game:
+            send_json(conn, {"ok": False, "error": "Game not found"})
+            return
+        # Get developer/author info (與版本、評論同時查詢)
+        developer, versions, reviews = self.db_parallel(
+            (self.read_developer, game.get("owner_id")),
+            (self.db_cached, "GameVersion", "list_by_game", {"gameId": game_id}),
+            (self.db.call, "GameReview", "list_by_game", {"gameId": game_id}),
+        )
+        send_json(conn, {"ok": True, "game": game, "developer": developer, "versions": versions, "reviews": reviews})
+
+    def handle_plugin_list(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
+        plugins = self.db.call("Plugin", "list", {})
+        installed = self.db.call(
+            "PlayerPlugin", "list_by_player", {"playerId": session.account["id"]}
+        )
+        send_json(conn, {"ok": True, "plugins": plugins, "installed": installed})
+
+    def read_developer(self, owner_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        """取得遊戲作者資訊，查詢失敗時回傳 None"""
+        if not owner_id:
+            return None
+        try:
+            return self.db_cached("DeveloperAccount", "read", {"id": owner_id})
+        except Exception:
+            return None
 
-    def handle_register(self, conn: socket.socket, req: Dict[str, any]) -> None:
+    def handle_register(self, conn: LobbyConnection, req: Dict[str, any]) -> None:
         username = req.get("username")
         password_hash = req.get("passwordHash")
         display_name = req.get("displayName") or username
@@ -316,7 +665,7 @@ class LobbyServer:
         print(f"[Lobby] New player registered: '{username}' (ID: {created['id']})")
         send_json(conn, {"ok": True, "playerId": created["id"]})
 
-    def handle_login(self, conn: socket.socket, req: Dict[str, any]) -> None:
+    def handle_login(self, conn: LobbyConnection, req: Dict[str, any]) -> None:
         username = req.get("username")
         password_hash = req.get("passwordHash")
         account = self.db.call("PlayerAccount", "read_by_username", {"username": username})
@@ -325,16 +674,25 @@ class LobbyServer:
             return
         
         # 檢查是否已經有其他連線登入此帳號（禁止重複登入）
-        with self.lock:
-            for existing_conn, existing_session in self.sessions.items():
-                if existing_session and existing_session.account["id"] == account["id"]:
-                    send_json(conn, {"ok": False, "error": "This account is already logged in from another session"})
-                    return
-        
-        self.db.call("PlayerAccount", "set_last_login", {"id": account["id"]})
+        # 由 DB 的 player_sessions 主鍵判斷並佔用，多台 Lobby Server 之間也不會重複登入
         session = PlayerSession(account)
-        with self.lock:
+        acquired = self.db.call(
+            "PlayerAccount",
+            "try_acquire_session",
+            {"id": account["id"], "serverId": self.server_id, "token": session.token},
+        )
+        if not acquired.get("acquired"):
+            send_frame(conn, ERR_ALREADY_LOGGED_IN)
+            return
+        with self.sessions_lock:
+            previous = self.sessions.get(conn)
+            if previous:
+                # 同一連線改登入其他帳號，釋放原帳號
+                self.sessions_by_player.pop(previous.account["id"], None)
+            self.sessions_by_player[account["id"]] = session
             self.sessions[conn] = session
+        if previous:
+            self.release_session(previous)
         print(f"[Lobby] Player '{username}' logged in (ID: {account['id']})")
         send_json(
             conn,
@@ -349,7 +707,7 @@ class LobbyServer:
             },
         )
 
-    def handle_download(self, conn: socket.socket, session: PlayerSession, req: Dict[str, any]) -> None:
+    def handle_download(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         game_id = req.get("gameId")
         version_id = req.get("versionId")
         game = self.db.call("Game", "read", {"id": game_id})
@@ -369,26 +727,26 @@ class LobbyServer:
             return
         
         if version_id:
-            version = self.db.call("GameVersion", "read", {"id": version_id})
+            version = self.db_cached("GameVersion", "read", {"id": version_id})
         else:
             latest_id = game.get("latest_version_id")
             if not latest_id:
                 send_json(conn, {"ok": False, "error": "no published version"})
                 return
-            version = self.db.call("GameVersion", "read", {"id": latest_id})
+            version = self.db_cached("GameVersion", "read", {"id": latest_id})
         if not version:
             send_json(conn, {"ok": False, "error": "version not found"})
             return
         path = Path(version["package_path"])
-        if not path.exists():
+        try:
+            size = path.stat().st_size
+        except OSError:
             send_json(conn, {"ok": False, "error": "package missing"})
             return
-        raw = path.read_bytes()
-        
-        # Compute SHA256 hash for integrity verification
-        sha256_hash = hashlib.sha256(raw).hexdigest()
+        if size <= 0 or size > MAX_FRAME:
+            send_json(conn, {"ok": False, "error": "package size not supported"})
+            return
         
-        payload = base64.b64encode(raw).decode("ascii")
         self.db.call(
             "PlayerDownload",
             "record",
@@ -400,20 +758,23 @@ class LobbyServer:
                 "ok": True,
                 "game": game,
                 "version": version,
-                "package": payload,
-                "sha256": sha256_hash,
+                # 套件以獨立的二進位 frame 緊接在此回應之後，不經 base64
+                "packageSize": size,
+                # 上傳時已對同一份檔案計算並記錄 SHA256，供客戶端驗證完整性
+                "sha256": version["package_sha256"],
             },
         )
+        conn.send_file(path, size)
 
-    def handle_list_rooms(self, conn: socket.socket) -> None:
-        rooms = self.db.call("Room", "list_open", {})
-        enriched = []
-        for room in rooms:
-            members = self.db.call("RoomMember", "list", {"roomId": room["id"]})
-            enriched.append({"room": room, "members": members})
+    def handle_list_rooms(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
+        page = {k: req[k] for k in PAGE_KEYS if k in req}
+        rooms = self.db.call("Room", "list_open", page)
+        # 所有房間的成員一次查詢 (JSON 物件的 key 為字串)
+        members = self.db.call("RoomMember", "list_for_rooms", {"roomIds": [room["id"] for room in rooms]})
+        enriched = [{"room": room, "members": members.get(str(room["id"]), [])} for room in rooms]
         send_json(conn, {"ok": True, "rooms": enriched})
 
-    def handle_create_room(self, conn: socket.socket, session: PlayerSession, req: Dict[str, any]) -> None:
+    def handle_create_room(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         # Check if player is already in a room
         existing_room = self.db.call("RoomMember", "find_player_room", {"playerId": session.account["id"]})
         if existing_room:
@@ -441,7 +802,7 @@ class LobbyServer:
         version_id = req.get("versionId")
         if not version_id:
             version_id = game.get("latest_version_id")
-        version = self.db.call("GameVersion", "read", {"id": version_id})
+        version = self.db_cached("GameVersion", "read", {"id": version_id})
         if not version:
             send_json(conn, {"ok": False, "error": "version not found"})
             return
@@ -459,25 +820,33 @@ class LobbyServer:
             "visibility": visibility,
         }
         
-        code = self.generate_room_code()
-        result = self.db.call(
-            "Room",
-            "create",
-            {
-                "code": code,
-                "ownerPlayerId": session.account["id"],
-                "gameId": game_id,
-                "gameVersionId": version_id,
-                "capacity": req.get("capacity", 4),
-                "metadataJson": json.dumps(metadata),
-            },
-        )
-        room_id = result["id"]
-        self.db.call("RoomMember", "add", {"roomId": room_id, "playerId": session.account["id"]})
+        # 房間代碼的唯一性由 DB 的 UNIQUE 限制保證，代碼重複時換一個重試
+        room_id = None
+        for _ in range(ROOM_CODE_ATTEMPTS):
+            code = self.generate_room_code()
+            result = self.db.call(
+                "Room",
+                "create_with_owner",
+                {
+                    "code": code,
+                    "ownerPlayerId": session.account["id"],
+                    "gameId": game_id,
+                    "gameVersionId": version_id,
+                    "capacity": req.get("capacity", 4),
+                    "metadataJson": encode_json(metadata).decode("utf-8"),
+                },
+            )
+            room_id = result["id"]
+            if room_id is not None:
+                break
+        if room_id is None:
+            send_json(conn, {"ok": False, "error": "failed to allocate room code, please retry"})
+            return
+        session.current_room_id = room_id
         print(f"[Lobby] Player '{session.account['username']}' created room '{code}' (ID: {room_id})")
         send_json(conn, {"ok": True, "roomCode": code, "roomId": room_id})
 
-    def handle_join_room(self, conn: socket.socket, session: PlayerSession, req: Dict[str, any]) -> None:
+    def handle_join_room(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         # Check if player is already in a room
         existing_room = self.db.call("RoomMember", "find_player_room", {"playerId": session.account["id"]})
         if existing_room:
@@ -500,7 +869,7 @@ class LobbyServer:
             send_json(conn, {"ok": False, "error": "missing room identifier"})
             return
         if not room:
-            send_json(conn, {"ok": False, "error": "room not found"})
+            send_frame(conn, ERR_ROOM_NOT_FOUND)
             return
         
         # 檢查房間狀態
@@ -514,59 +883,68 @@ class LobbyServer:
             send_json(conn, {"ok": False, "error": "room full"})
             return
         self.db.call("RoomMember", "add", {"roomId": room["id"], "playerId": session.account["id"]})
+        session.current_room_id = room["id"]
         print(f"[Lobby] Player '{session.account['username']}' joined room '{room.get('code')}' (ID: {room['id']})")
         send_json(conn, {"ok": True, "roomId": room["id"]})
 
-    def handle_leave_room(self, conn: socket.socket, session: PlayerSession, req: Dict[str, any]) -> None:
+    def handle_leave_room(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         room_id = req.get("roomId")
         if not room_id:
-            send_json(conn, {"ok": False, "error": "missing roomId"})
+            send_frame(conn, ERR_MISSING_ROOM_ID)
             return
         try:
             room_id_int = int(room_id)
         except (TypeError, ValueError):
-            send_json(conn, {"ok": False, "error": "invalid roomId"})
+            send_frame(conn, ERR_INVALID_ROOM_ID)
             return
-        room = self.db.call("Room", "read", {"id": room_id_int})
-        self.db.call("RoomMember", "remove", {"roomId": room_id_int, "playerId": session.account["id"]})
+        room, _ = self.db_parallel(
+            (self.db.call, "Room", "read", {"id": room_id_int}),
+            (self.db.call, "RoomMember", "remove", {"roomId": room_id_int, "playerId": session.account["id"]}),
+        )
+        if session.current_room_id == room_id_int:
+            session.current_room_id = None
         room_code = room.get('code') if room else '?'
         print(f"[Lobby] Player '{session.account['username']}' left room '{room_code}' (ID: {room_id_int})")
         if room and room["owner_player_id"] == session.account["id"]:
             print(f"[Lobby] Room '{room_code}' closed (host left)")
             self.cleanup_room(room_id_int)
-        send_json(conn, {"ok": True})
+        send_frame(conn, OK_RESPONSE)
 
-    def handle_get_room_details(self, conn: socket.socket, session: PlayerSession, req: Dict[str, any]) -> None:
+    def handle_get_room_details(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         room_id_val = req.get("roomId")
         try:
             room_id = int(room_id_val)
         except (TypeError, ValueError):
-            send_json(conn, {"ok": False, "error": "invalid roomId"})
+            send_frame(conn, ERR_INVALID_ROOM_ID)
             return
-        room = self.db.call("Room", "read", {"id": room_id})
+        room, members = self.db_parallel(
+            (self.db.call, "Room", "read", {"id": room_id}),
+            (self.db.call, "RoomMember", "list", {"roomId": room_id}),
+        )
         if not room:
-            send_json(conn, {"ok": False, "error": "room not found"})
+            send_frame(conn, ERR_ROOM_NOT_FOUND)
             return
-        members = self.db.call("RoomMember", "list", {"roomId": room_id})
         in_room = any(member.get("player_id") == session.account["id"] for member in members)
         if not in_room:
-            send_json(conn, {"ok": False, "error": "not in room"})
+            send_frame(conn, ERR_NOT_IN_ROOM)
             return
         response: Dict[str, any] = {"ok": True, "room": room, "members": members}
-        with self.lock:
+        # 只在 lock 內複製需要的欄位，回應的組裝與傳送都在 lock 外進行
+        with self.rooms_lock:
             active = self.active_rooms.get(room_id)
-        if active:
-            launch_info = dict(active.get("info", {}))
+            snapshot = {"info": dict(active["info"]), "startedAt": active["startedAt"]} if active else None
+        if snapshot:
+            launch_info = snapshot["info"]
             launch_info.setdefault("gameId", room.get("game_id"))
             response["activeLaunch"] = launch_info
-            response["startedAt"] = active.get("startedAt")
+            response["startedAt"] = snapshot["startedAt"]
         send_json(conn, response)
 
-    def handle_start_game(self, conn: socket.socket, session: PlayerSession, req: Dict[str, any]) -> None:
+    def handle_start_game(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> Optional[Future]:
         room_id = req.get("roomId")
         room = self.db.call("Room", "read", {"id": room_id})
         if not room:
-            send_json(conn, {"ok": False, "error": "room not found"})
+            send_frame(conn, ERR_ROOM_NOT_FOUND)
             return
         if room["owner_player_id"] != session.account["id"]:
             send_json(conn, {"ok": False, "error": "only host can start"})
@@ -578,27 +956,40 @@ class LobbyServer:
             send_json(conn, {"ok": False, "error": f"cannot start game (room status: {room_status})"})
             return
         
-        version = self.db.call("GameVersion", "read", {"id": room["game_version_id"]})
+        version, members, game = self.db_parallel(
+            (self.db_cached, "GameVersion", "read", {"id": room["game_version_id"]}),
+            (self.db.call, "RoomMember", "list", {"roomId": room_id}),
+            (self.db_cached, "Game", "read", {"id": room["game_id"]}),
+        )
         if not version:
             send_json(conn, {"ok": False, "error": "version missing"})
             return
         
-        members = self.db.call("RoomMember", "list", {"roomId": room_id})
-        
         # 檢查最少玩家數
-        game = self.db.call("Game", "read", {"id": room["game_id"]})
         min_players = game.get("min_players", 1) if game else 1
         if len(members) < min_players:
             send_json(conn, {"ok": False, "error": f"need at least {min_players} player(s) to start (currently {len(members)})"})
             return
         
+        # 解壓縮與啟動程序交給 launch pool，request worker 不必等待 (回應於完成後送出)
+        return self._launch_pool.submit(self.finish_start_game, conn, room, version, members)
+
+    def finish_start_game(
+        self,
+        conn: LobbyConnection,
+        room: Dict[str, any],
+        version: Dict[str, any],
+        members: List[Dict[str, any]],
+    ) -> None:
+        """在 launch pool 中準備 Runtime、啟動 Game Server 並回應 START_GAME"""
+        room_id = room["id"]
         try:
             process, runtime_dir, launch_info = self.launch_game_instance(room, version, members)
         except Exception as exc:
             send_json(conn, {"ok": False, "error": str(exc)})
             return
         launch_info.setdefault("gameId", room.get("game_id"))
-        with self.lock:
+        with self.rooms_lock:
             self.active_rooms[room_id] = {
                 "process": process,
                 "runtime": runtime_dir,
@@ -611,23 +1002,21 @@ class LobbyServer:
         send_json(conn, {"ok": True, "launch": launch_info})
 
     def monitor_room_process(self, room_id: int) -> None:
-        with self.lock:
+        with self.rooms_lock:
             entry = self.active_rooms.get(room_id)
-        if not entry:
-            return
-        process = entry.get("process")
-        runtime = entry.get("runtime")
+            if not entry:
+                return
+            process = entry.get("process")
+            runtime = entry.get("runtime")
+        # process.wait() 在 lock 外執行，避免阻塞其他房間的操作
         try:
             if process:
                 process.wait()
         except Exception as exc:
             print(f"[Lobby] monitor_room_process wait failed for room {room_id}: {exc}")
         if runtime:
-            try:
-                shutil.rmtree(runtime, ignore_errors=True)
-            except Exception:
-                pass
-        with self.lock:
+            self._reaper_q.put(runtime)
+        with self.rooms_lock:
             removed = self.active_rooms.pop(room_id, None)
         if not removed:
             return
@@ -650,22 +1039,23 @@ class LobbyServer:
 
     def get_online_player_ids(self) -> set:
         """Return set of player IDs currently logged in"""
-        with self.lock:
-            return {sess.account["id"] for sess in self.sessions.values() if sess}
+        with self.sessions_lock:
+            return set(self.sessions_by_player)
 
-    def handle_get_game(self, conn: socket.socket, session: PlayerSession, req: Dict[str, any]) -> None:
+    def handle_get_game(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         room_id = req.get("roomId")
         if room_id is None:
-            send_json(conn, {"ok": False, "error": "missing roomId"})
+            send_frame(conn, ERR_MISSING_ROOM_ID)
             return
-        with self.lock:
+        with self.rooms_lock:
             entry = self.active_rooms.get(int(room_id))
-        if not entry:
+            info = dict(entry["info"]) if entry else None
+        if info is None:
             send_json(conn, {"ok": False, "error": "no active game"})
             return
         room = self.db.call("Room", "read", {"id": room_id})
         if not room:
-            send_json(conn, {"ok": False, "error": "room not found"})
+            send_frame(conn, ERR_ROOM_NOT_FOUND)
             return
         members = self.db.call("RoomMember", "list", {"roomId": room_id})
         allowed = False
@@ -674,13 +1064,12 @@ class LobbyServer:
                 allowed = True
                 break
         if not allowed:
-            send_json(conn, {"ok": False, "error": "not in room"})
+            send_frame(conn, ERR_NOT_IN_ROOM)
             return
-        info = dict(entry.get("info", {}))
         info.setdefault("gameId", room.get("game_id"))
         send_json(conn, {"ok": True, "launch": info})
 
-    def handle_submit_review(self, conn: socket.socket, session: PlayerSession, req: Dict[str, any]) -> None:
+    def handle_submit_review(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         game_id = req.get("gameId")
         rating = req.get("rating")
         comment = req.get("comment", "")
@@ -690,7 +1079,7 @@ class LobbyServer:
             send_json(conn, {"ok": False, "error": "請選擇要評論的遊戲"})
             return
         
-        game = self.db.call("Game", "read", {"id": game_id})
+        game = self.db_cached("Game", "read", {"id": game_id})
         if not game:
             send_json(conn, {"ok": False, "error": "遊戲不存在"})
             return
@@ -706,18 +1095,10 @@ class LobbyServer:
             send_json(conn, {"ok": False, "error": "評分必須在 1.0-5.0 之間"})
             return
         
-        # Check if player has played/downloaded this game
+        # Check if player has played/downloaded any version of this game
         player_id = session.account["id"]
-        downloads = self.db.call("PlayerDownload", "list_versions", {"playerId": player_id})
-        
-        # Get all version IDs for this game
-        versions = self.db.call("GameVersion", "list_by_game", {"gameId": game_id})
-        game_version_ids = {v["id"] for v in versions} if versions else set()
-        
-        # Check if player has downloaded any version of this game
-        has_played = any(d["game_version_id"] in game_version_ids for d in downloads)
-        
-        if not has_played:
+        played = self.db.call("PlayerDownload", "has_played_game", {"playerId": player_id, "gameId": game_id})
+        if not played["played"]:
             send_json(conn, {"ok": False, "error": "您尚未遊玩過此遊戲，無法評論"})
             return
         
@@ -738,37 +1119,26 @@ class LobbyServer:
                 "comment": comment,
             },
         )
+        # 評分彙總存在 games 上，列表與遊戲資料需重新查詢
+        self.invalidate_cache("Game", "list_published")
+        self.invalidate_cache("Game", "read")
         send_json(conn, {"ok": True, "message": "評論已成功送出"})
 
-    def handle_list_active_players(self, conn: socket.socket) -> None:
-        with self.lock:
-            sessions = [sess for sess in self.sessions.values() if sess]
+    def handle_list_active_players(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
+        with self.sessions_lock:
+            sessions = list(self.sessions_by_player.values())
         
-        # 取得每個玩家所在的房間資訊
-        player_rooms: Dict[int, Optional[Dict]] = {}
-        for sess in sessions:
-            player_id = sess.account["id"]
-            if player_id not in player_rooms:
-                # 查詢玩家所在的房間
-                memberships = self.db.call("RoomMember", "list_by_player", {"playerId": player_id})
-                if memberships:
-                    # 取得第一個房間的資訊
-                    room_id = memberships[0].get("room_id")
-                    room = self.db.call("Room", "read", {"id": room_id})
-                    player_rooms[player_id] = room
-                else:
-                    player_rooms[player_id] = None
+        # 一次查詢所有線上玩家所在的房間 (JSON 物件的 key 為字串)
+        player_rooms = self.db.call(
+            "RoomMember", "list_by_players", {"playerIds": [sess.account["id"] for sess in sessions]}
+        )
         
         players = []
-        seen: set[int] = set()
         for sess in sessions:
             player_id = sess.account["id"]
-            if player_id in seen:
-                continue
-            seen.add(player_id)
             
             # 決定玩家狀態
-            room = player_rooms.get(player_id)
+            room = player_rooms.get(str(player_id))
             if room:
                 room_status = room.get("status", "waiting")
                 if room_status == "playing":
@@ -789,15 +1159,24 @@ class LobbyServer:
             )
         send_json(conn, {"ok": True, "players": players})
 
-    def handle_logout(self, conn: socket.socket, session: PlayerSession) -> None:
+    def handle_logout(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         """Handle user logout - cleanup their rooms and invites"""
         print(f"[Lobby] Player '{session.account['username']}' logged out")
         self.cleanup_user(session.account["id"])
-        with self.lock:
+        with self.sessions_lock:
             self.sessions[conn] = None
-        send_json(conn, {"ok": True})
+            self.sessions_by_player.pop(session.account["id"], None)
+        self.release_session(session)
+        send_frame(conn, OK_RESPONSE)
+
+    def release_session(self, session: PlayerSession) -> None:
+        """刪除 DB 中的登入 Session，讓此帳號可以再次登入"""
+        try:
+            self.db.call("PlayerAccount", "release_session", {"id": session.account["id"], "token": session.token})
+        except Exception as exc:
+            print(f"[Lobby] release_session failed: {exc}")
 
-    def handle_invite(self, conn: socket.socket, session: PlayerSession, req: Dict[str, any]) -> None:
+    def handle_invite(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         """Invite a player to a room - only host can invite"""
         room_id = req.get("roomId")
         to_player_id = req.get("toPlayerId")
@@ -810,15 +1189,16 @@ class LobbyServer:
             send_json(conn, {"ok": False, "error": "cannot invite yourself"})
             return
         
-        # 檢查目標玩家是否存在
-        target_player = self.db.call("PlayerAccount", "read", {"id": to_player_id})
-        if not target_player:
-            send_json(conn, {"ok": False, "error": "player not found"})
-            return
+        # 房間、房間人數與成員資格以一次批次查詢取得
+        # (目標玩家是否存在由 Invite.create 在寫入時判斷)
+        room, member_count, already_member = self.db.batch([
+            ("Room", "read", {"id": room_id}),
+            ("RoomMember", "count_for_room", {"roomId": room_id}),
+            ("RoomMember", "is_member", {"roomId": room_id, "playerId": to_player_id}),
+        ])
         
-        room = self.db.call("Room", "read", {"id": room_id})
         if not room:
-            send_json(conn, {"ok": False, "error": "room not found"})
+            send_frame(conn, ERR_ROOM_NOT_FOUND)
             return
         
         # 只有房主可以邀請
@@ -831,75 +1211,52 @@ class LobbyServer:
             send_json(conn, {"ok": False, "error": "room is not waiting for players"})
             return
         
-        # 檢查房間是否已滿
-        members = self.db.call("RoomMember", "list", {"roomId": room_id})
-        if len(members) >= room.get("capacity", 4):
+        # 檢查房間是否已滿、目標玩家是否已在此房間
+        if member_count >= room.get("capacity", 4):
             send_json(conn, {"ok": False, "error": "room is full"})
             return
-        
-        # 檢查目標玩家是否已在此房間
-        for member in members:
-            if member.get("player_id") == to_player_id:
-                send_json(conn, {"ok": False, "error": "player is already in this room"})
-                return
+        if already_member:
+            send_json(conn, {"ok": False, "error": "player is already in this room"})
+            return
         
         result = self.db.call(
             "Invite",
             "create",
             {"roomId": room_id, "fromPlayerId": session.account["id"], "toPlayerId": to_player_id},
         )
+        if result["id"] is None:
+            send_json(conn, {"ok": False, "error": "player not found"})
+            return
         send_json(conn, {"ok": True, "inviteId": result["id"]})
 
-    def handle_list_invites(self, conn: socket.socket, session: PlayerSession) -> None:
+    def handle_list_invites(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         """List pending invites for current player"""
         invites = self.db.call("Invite", "list_by_player", {"playerId": session.account["id"]})
         send_json(conn, {"ok": True, "invites": invites})
 
-    def handle_accept_invite(self, conn: socket.socket, session: PlayerSession, req: Dict[str, any]) -> None:
+    def handle_accept_invite(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         """Accept an invite and join the room"""
         invite_id = req.get("inviteId")
         if not invite_id:
             send_json(conn, {"ok": False, "error": "missing inviteId"})
             return
         
-        # 檢查玩家是否已在其他房間
-        existing_room = self.db.call("RoomMember", "find_player_room", {"playerId": session.account["id"]})
-        if existing_room:
-            send_json(conn, {"ok": False, "error": f"You are already in room {existing_room['code']}. Leave it first."})
-            return
-        
-        invite = self.db.call("Invite", "read", {"id": invite_id})
-        if not invite or invite.get("to_player_id") != session.account["id"] or invite.get("status") != "pending":
-            send_json(conn, {"ok": False, "error": "invalid invite"})
-            return
-        room_id = invite["room_id"]
-        room = self.db.call("Room", "read", {"id": room_id})
-        if not room:
-            self.db.call("Invite", "delete_by_room", {"roomId": room_id})
-            send_json(conn, {"ok": False, "error": "room not found"})
-            return
-        if room["status"] != "waiting":
-            send_json(conn, {"ok": False, "error": "room not waiting"})
-            return
-        members = self.db.call("RoomMember", "list", {"roomId": room_id})
-        if len(members) >= room["capacity"]:
-            send_json(conn, {"ok": False, "error": "room full"})
-            return
-        self.db.call("RoomMember", "add", {"roomId": room_id, "playerId": session.account["id"]})
-        self.db.call("Invite", "update_status", {"id": invite_id, "status": "accepted"})
-        send_json(conn, {"ok": True, "roomId": room_id})
+        # 驗證 (邀請對象、是否已在其他房間、房間狀態與人數) 與加入房間由 DB Server 一次完成
+        result = self.db.call("Invite", "accept", {"id": invite_id, "playerId": session.account["id"]})
+        if result.get("ok"):
+            session.current_room_id = result["roomId"]
+        send_json(conn, result)
 
-    def handle_plugin_install(self, conn: socket.socket, session: PlayerSession, req: Dict[str, any]) -> None:
+    def handle_plugin_install(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         slug = req.get("slug")
-        plugin = self.db.call("Plugin", "read", {"slug": slug})
+        plugin = self.db_cached("Plugin", "read", {"slug": slug})
         if not plugin:
             send_json(conn, {"ok": False, "error": "plugin not found"})
             return
-        path = Path(plugin["package_path"])
-        if not path.exists():
+        package = self.plugin_package(plugin["package_path"])
+        if package is None:
             send_json(conn, {"ok": False, "error": "plugin package missing"})
             return
-        raw = path.read_bytes()
         self.db.call(
             "PlayerPlugin",
             "install",
@@ -914,13 +1271,42 @@ class LobbyServer:
             {
                 "ok": True,
                 "plugin": plugin,
-                "package": base64.b64encode(raw).decode("ascii"),
+                "package": package,
             },
         )
 
-    def handle_plugin_remove(self, conn: socket.socket, session: PlayerSession, req: Dict[str, any]) -> None:
+    def plugin_package(self, package_path: str) -> Optional[str]:
+        """
+        取得 Plugin 套件的 base64 內容，檔案不存在時回傳 None
+
+        編碼結果依路徑快取，檔案的修改時間或大小改變 (重新註冊 Plugin) 時才重新讀取
+        """
+        try:
+            st = os.stat(package_path)
+        except OSError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._cache_lock:
+            cached = self._plugin_packages.get(package_path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        with open(package_path, "rb") as fp:
+            package = base64.b64encode(fp.read()).decode("ascii")
+        with self._cache_lock:
+            self._plugin_packages[package_path] = (stamp, package)
+        return package
+
+    def warm_plugin_packages(self) -> None:
+        """讀取並編碼所有已註冊 Plugin 的套件，放入 plugin_package 的快取"""
+        try:
+            for plugin in self.db.call("Plugin", "list", {}):
+                self.plugin_package(plugin["package_path"])
+        except Exception as exc:
+            print(f"[Lobby] warm_plugin_packages failed: {exc}")
+
+    def handle_plugin_remove(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         slug = req.get("slug")
-        plugin = self.db.call("Plugin", "read", {"slug": slug})
+        plugin = self.db_cached("Plugin", "read", {"slug": slug})
         if not plugin:
             send_json(conn, {"ok": False, "error": "plugin not found"})
             return
@@ -929,9 +1315,9 @@ class LobbyServer:
             "remove",
             {"playerId": session.account["id"], "pluginId": plugin["id"]},
         )
-        send_json(conn, {"ok": True})
+        send_frame(conn, OK_RESPONSE)
 
-    def handle_room_chat(self, conn: socket.socket, session: PlayerSession, req: Dict[str, any]) -> None:
+    def handle_room_chat(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         """
         處理房間聊天訊息 (Plugin 功能)
         """
@@ -939,7 +1325,7 @@ class LobbyServer:
         message = req.get("message", "").strip()
         
         if not room_id:
-            send_json(conn, {"ok": False, "error": "missing roomId"})
+            send_frame(conn, ERR_MISSING_ROOM_ID)
             return
         
         if not message:
@@ -952,47 +1338,86 @@ class LobbyServer:
             return
         
         # 檢查玩家是否在此房間
-        member = self.db.call("RoomMember", "find_player_room", {"playerId": session.account["id"]})
-        if not member or member.get("room_id") != room_id:
-            send_json(conn, {"ok": False, "error": "you are not in this room"})
+        if not self.in_room(session, room_id):
+            send_frame(conn, ERR_NOT_IN_THIS_ROOM)
             return
         
-        # 儲存聊天訊息
-        self.db.call("RoomChat", "create", {
-            "roomId": room_id,
-            "playerId": session.account["id"],
-            "message": message,
-        })
+        # 佇列已達上限 (DB 持續無法寫入) 時先同步寫入，仍無法寫入則回覆錯誤而不再累積
+        if len(self._chat_queue) >= CHAT_QUEUE_LIMIT and not self.flush_chat():
+            send_frame(conn, ERR_CHAT_UNAVAILABLE)
+            return
         
-        send_json(conn, {"ok": True})
+        # 儲存聊天訊息: 先放入佇列，由背景 thread 批次寫入 (時間以收到訊息時為準)
+        with self._chat_cv:
+            self._chat_queue.append([room_id, session.account["id"], message, int(time.time())])
+            if len(self._chat_queue) >= CHAT_FLUSH_BATCH:
+                self._chat_cv.notify()
+            # 此房間的聊天記錄快取失效
+            self._chat_history.pop(room_id, None)
+            self._chat_versions[room_id] = self._chat_versions.get(room_id, 0) + 1
+        
+        send_frame(conn, OK_RESPONSE)
+
+    def in_room(self, session: PlayerSession, room_id: Any) -> bool:
+        """
+        玩家是否在指定的房間中
+
+        建立/加入/接受邀請時記錄在 session.current_room_id，離開或房間清理時清除；
+        記錄不符時才向 DB 查詢並更新記錄
+        """
+        if room_id is not None and room_id == session.current_room_id:
+            return True
+        member = self.db.call("RoomMember", "find_player_room", {"playerId": session.account["id"]})
+        session.current_room_id = member["room_id"] if member else None
+        return session.current_room_id is not None and session.current_room_id == room_id
 
-    def handle_get_room_chat_history(self, conn: socket.socket, session: PlayerSession, req: Dict[str, any]) -> None:
+    def handle_get_room_chat_history(self, conn: LobbyConnection, session: PlayerSession, req: Dict[str, any]) -> None:
         """
         取得房間聊天記錄 (Plugin 功能)
         """
         room_id = req.get("roomId")
-        limit = req.get("limit", 50)
+        limit = req.get("limit", CHAT_HISTORY_LIMIT)
+        # 限制在 1 ~ CHAT_HISTORY_MAX_LIMIT (負數在 SQLite 中代表不限筆數)
+        if not isinstance(limit, int) or isinstance(limit, bool):
+            limit = CHAT_HISTORY_LIMIT
+        limit = max(1, min(limit, CHAT_HISTORY_MAX_LIMIT))
         
         if not room_id:
-            send_json(conn, {"ok": False, "error": "missing roomId"})
+            send_frame(conn, ERR_MISSING_ROOM_ID)
             return
         
         # 檢查玩家是否在此房間
-        member = self.db.call("RoomMember", "find_player_room", {"playerId": session.account["id"]})
-        if not member or member.get("room_id") != room_id:
-            send_json(conn, {"ok": False, "error": "you are not in this room"})
+        if not self.in_room(session, room_id):
+            send_frame(conn, ERR_NOT_IN_THIS_ROOM)
             return
         
-        # 取得聊天記錄
+        # 沒有新訊息時直接送出快取的回應 (CACHE_TTL 內有效，涵蓋其他 Lobby Server 寫入的訊息)
+        cacheable = isinstance(room_id, int)
+        if cacheable:
+            with self._chat_cv:
+                entry = self._chat_history.get(room_id, {}).get(limit)
+                if entry and time.monotonic() - entry[0] < CACHE_TTL:
+                    self._chat_history.move_to_end(room_id)
+                    send_frame(conn, entry[1])
+                    return
+                version = self._chat_versions.get(room_id, 0)
+        
+        # 取得聊天記錄 (先寫入暫存中的訊息，剛送出的訊息也會出現在記錄中)
+        self.flush_chat()
         messages = self.db.call("RoomChat", "list", {"roomId": room_id, "limit": limit})
-        send_json(conn, {"ok": True, "messages": messages})
+        body = encode_json({"ok": True, "messages": messages})
+        if cacheable:
+            with self._chat_cv:
+                if self._chat_versions.get(room_id, 0) == version:
+                    self._chat_history.setdefault(room_id, {})[limit] = (time.monotonic(), body)
+                    self._chat_history.move_to_end(room_id)
+                    if len(self._chat_history) > CHAT_HISTORY_CACHE_ROOMS:
+                        self._chat_history.popitem(last=False)
+        send_frame(conn, body)
 
     def generate_room_code(self) -> str:
-        while True:
-            code = "".join(random.choice(CODE_ALPHABET) for _ in range(6))
-            exists = self.db.call("Room", "read_by_code", {"code": code})
-            if not exists:
-                return code
+        """產生隨機房間代碼 (是否重複由 Room.create_with_owner 判斷)"""
+        return "".join(random.choices(CODE_ALPHABET, k=ROOM_CODE_LENGTH))
 
     def prepare_runtime(self, room_id: int, version: Dict[str, Any]) -> Path:
         package_path = Path(version["package_path"])
@@ -1002,8 +1427,20 @@ class LobbyServer:
         if target.exists():
             shutil.rmtree(target)
         target.mkdir(parents=True, exist_ok=True)
+        root = str(target.resolve())
         with zipfile.ZipFile(package_path, "r") as zf:
-            zf.extractall(target)
+            for info in zf.infolist():
+                # 與 extractall 相同，拒絕解壓到 Runtime 資料夾之外 (絕對路徑或 ..)
+                out = os.path.realpath(os.path.join(root, info.filename))
+                if os.path.commonpath([root, out]) != root:
+                    raise ValueError(f"invalid path in package: {info.filename}")
+                if info.is_dir():
+                    os.makedirs(out, exist_ok=True)
+                    continue
+                os.makedirs(os.path.dirname(out), exist_ok=True)
+                # 以大區塊複製，減少大型套件解壓時的讀寫次數
+                with zf.open(info) as src, open(out, "wb", buffering=EXTRACT_BUFFER) as dst:
+                    shutil.copyfileobj(src, dst, EXTRACT_BUFFER)
         return target
 
     def launch_game_instance(
@@ -1025,26 +1462,28 @@ class LobbyServer:
                     "slot": idx,
                 }
             )
-        env = os.environ.copy()
-        env.update(
-            {
-                "GAME_SERVER_HOST": self.host,
-                "GAME_SERVER_PORT": str(port),
-                "GAME_ROOM_ID": str(room["id"]),
-                "GAME_ROOM_TOKEN": room_token,
-                "LOBBY_HOST": self.host,
-                "LOBBY_PORT": str(self.port),
-                "GAME_VERSION_ID": str(version["id"]),
-                "ROOM_PLAYERS": json.dumps(players),
-                "ROOM_METADATA": room.get("metadata_json", "{}"),
-            }
-        )
-        process = subprocess.Popen(
-            version["server_entrypoint"],
-            cwd=runtime_dir,
-            shell=True,
-            env=env,
-        )
+        env = self._base_env | {
+            "GAME_SERVER_PORT": str(port),
+            "GAME_ROOM_ID": str(room["id"]),
+            "GAME_ROOM_TOKEN": room_token,
+            "GAME_VERSION_ID": str(version["id"]),
+            "ROOM_PLAYERS": encode_json(players).decode("utf-8"),
+            "ROOM_METADATA": room.get("metadata_json", "{}"),
+        }
+        # 不經過 shell 直接執行，少啟動一個 /bin/sh，terminate() 也會直接送到 Game Server
+        try:
+            argv = shlex.split(version["server_entrypoint"], posix=os.name != "nt")
+            if not argv:
+                raise ValueError("server entrypoint is empty")
+            process = subprocess.Popen(
+                argv,
+                cwd=runtime_dir,
+                env=env,
+            )
+        except Exception:
+            # 找不到執行檔等啟動失敗時，已解壓的 Runtime 不會再被使用
+            self._reaper_q.put(runtime_dir)
+            raise
         launch_info = {
             "host": self.public_host,
             "port": port,
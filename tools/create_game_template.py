@@ -11,9 +11,13 @@ inside copied files.
 """
 
 import argparse
+import re
 import shutil
 from pathlib import Path
 
+# Only these file types are scanned for tokens.
+TEXT_SUFFIXES = frozenset({".txt", ".md", ".json", ".py", ".cfg", ".ini"})
+
 
 def list_templates(root: Path) -> None:
     print("Available templates:")
@@ -21,20 +25,23 @@ def list_templates(root: Path) -> None:
         print(f" - {child.name}")
 
 
-def replace_tokens(path: Path, replacements: dict) -> None:
-    if not replacements:
-        return
-    if path.suffix not in {".txt", ".md", ".json", ".py", ".cfg", ".ini"}:
+def compile_tokens(replacements: dict) -> tuple:
+    """Map each ``{{KEY}}`` token to its value and build one regex matching any of them."""
+    tokens = {f"{{{{{key}}}}}": value for key, value in replacements.items()}
+    pattern = re.compile("|".join(map(re.escape, tokens)))
+    return tokens, pattern
+
+
+def replace_tokens(path: Path, tokens: dict, pattern: "re.Pattern[str]") -> None:
+    if not tokens or path.suffix not in TEXT_SUFFIXES:
         return
     text = path.read_text(encoding="utf-8")
-    changed = False
-    for key, value in replacements.items():
-        token = f"{{{{{key}}}}}"
-        if token in text:
-            text = text.replace(token, value)
-            changed = True
-    if changed:
-        path.write_text(text, encoding="utf-8")
+    # Every token starts with "{{"; skip the regex pass for files without any.
+    if "{{" not in text:
+        return
+    new_text = pattern.sub(lambda match: tokens[match.group(0)], text)
+    if new_text != text:
+        path.write_text(new_text, encoding="utf-8")
 
 
 def copy_template(root: Path, template: str, dest: Path, game_name: str, overwrite: bool) -> None:
@@ -43,12 +50,16 @@ def copy_template(root: Path, template: str, dest: Path, game_name: str, overwri
         raise SystemExit(f"Template '{template}' not found. Run with --list to see options.")
     if dest.exists() and not overwrite:
         raise SystemExit(f"Destination '{dest}' already exists. Use --overwrite to replace it.")
-    shutil.copytree(source, dest, dirs_exist_ok=overwrite)
+    # Plain copies rather than hardlinks: editing a linked file in place would also
+    # change the bundled template. shutil.copy uses the kernel fast-copy path and
+    # keeps permission bits, without copy2's extra timestamp syscalls.
+    shutil.copytree(source, dest, dirs_exist_ok=overwrite, copy_function=shutil.copy)
     replacements = {"GAME_NAME": game_name} if game_name else {}
     if replacements:
+        tokens, pattern = compile_tokens(replacements)
         for file in dest.rglob("*"):
-            if file.is_file():
-                replace_tokens(file, replacements)
+            if file.suffix in TEXT_SUFFIXES and file.is_file():
+                replace_tokens(file, tokens, pattern)
     print(f"Created template at {dest}")
 
 